@@ -7,15 +7,26 @@
 
 import os
 import time
+import base64
+import random
 import logging
-import requests
-from typing import Dict, List, Optional
+from functools import lru_cache
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from nacl.signing import SigningKey
+from http_utils import create_requests_session, json_loads
 
 # 加载环境变量
 load_dotenv()
 
+@lru_cache(maxsize=None)
+def get_signer(private_key_b64: str) -> SigningKey:
+    """获取私钥对应的签名器（按私钥缓存，每个进程内每个私钥只解析一次）"""
+    return SigningKey(base64.b64decode(private_key_b64))
+
 @dataclass
 class AssetConfig:
     """资产配置"""
@@ -29,6 +40,11 @@ class AssetConfig:
     min_asset_amount: float = 0.0001  # 最小资产数量
     max_buy_amount: float = 50.0  # 单次最大买入金额
     
+    # 并发配置
+    max_concurrent_requests: int = 5  # 同时进行的API请求数上限
+    price_cache_ttl: float = 2.0  # 价格缓存有效期（秒）
+    balance_cache_ttl: float = 5.0  # 现货余额缓存有效期（秒）
+    
     def __post_init__(self):
         if self.target_assets is None:
             # 根据策略需求设置目标资产（按金额计算）
@@ -44,7 +60,28 @@ class AssetManager:
     
     def __init__(self, config: AssetConfig):
         self.config = config
-        self.session = requests.Session()
+        # 连接池：复用TLS连接，支持并发请求
+        # 限流和服务端错误由urllib3按状态码退避重试；连接异常和请求过期仍由_make_request重试
+        retry = Retry(total=3, connect=0, read=0, backoff_factor=0.3,
+                      status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+        self.session = create_requests_session(pool_connections=32, pool_maxsize=64, max_retries=retry)
+        
+        # 请求头模板（静态字段），每次请求只填充时间戳和签名
+        self._window = 5000
+        self._base_headers = {
+            'Content-Type': 'application/json',
+            'X-API-Key': config.api_key,
+            'X-Window': str(self._window)
+        }
+        
+        # 签名模板缓存 {(指令, 参数键): (排序后的参数键, 格式化模板)}
+        self._sig_templates: Dict[Tuple[str, Tuple[str, ...]], Tuple[Tuple[str, ...], str]] = {}
+        
+        # 价格缓存 {交易对: (价格, 获取时间)}
+        self._price_cache: Dict[str, Tuple[float, float]] = {}
+        
+        # 现货余额缓存 ({代币: 数量}, 获取时间)，用于下单前预判USDC是否充足
+        self._balance_cache: Tuple[Dict[str, float], float] = ({}, 0.0)
         
         # 配置日志
         logging.basicConfig(
@@ -52,39 +89,55 @@ class AssetManager:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger(__name__)
+        
+        # 签名器只在初始化时获取一次（libsodium实现）；私钥无效时记录错误，请求时返回None
+        try:
+            self._signer = get_signer(config.private_key)
+        except Exception as e:
+            self._signer = None
+            self.logger.error(f"私钥解析失败: {e}")
+    
+    def _build_signing_prefix(self, instruction: str, params: Optional[Dict]) -> bytes:
+        """构建签名前缀字节串: instruction=...&k1=v1&...（不含timestamp/window）"""
+        params = params or {}
+        cache_key = (instruction, tuple(params))
+        template = self._sig_templates.get(cache_key)
+        if template is None:
+            # 同一指令+参数键组合首次出现时生成模板，之后只做值替换
+            keys = tuple(sorted(params))
+            fmt = '&'.join([f"instruction={instruction}"] + [f"{k}=%s" for k in keys])
+            template = self._sig_templates[cache_key] = (keys, fmt)
+        
+        keys, fmt = template
+        return (fmt % tuple(params[k] for k in keys)).encode()
+    
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """指数退避+随机抖动，上限2秒"""
+        return random.uniform(0.1, min(2.0, 0.2 * 2 ** attempt))
     
     def _make_request(self, method: str, endpoint: str, instruction: str, params: Dict = None, max_retries: int = 3) -> Optional[Dict]:
         """发送认证请求（带重试机制）"""
+        if self._signer is None:
+            self.logger.error(f"私钥无效，无法签名请求: {endpoint}")
+            return None
+        
+        # 指令和参数部分在重试间不变，只在循环外构建一次
+        base_bytes = self._build_signing_prefix(instruction, params)
+        window = self._window
+        
         for attempt in range(max_retries):
             try:
-                from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
-                import base64
-                
-                # 解码私钥
-                private_key_bytes = base64.b64decode(self.config.private_key)
-                private_key = Ed25519PrivateKey.from_private_bytes(private_key_bytes)
-                
-                # 创建签名
+                # 每次尝试只重建时间戳后缀
                 timestamp = int(time.time() * 1000)
-                window = 5000
-                
-                # 构建签名字符串
-                if params:
-                    param_str = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-                    signing_string = f"instruction={instruction}&{param_str}&timestamp={timestamp}&window={window}"
-                else:
-                    signing_string = f"instruction={instruction}&timestamp={timestamp}&window={window}"
-                
-                # 签名
-                signature = private_key.sign(signing_string.encode())
+                signing_bytes = base_bytes + b"&timestamp=%d&window=%d" % (timestamp, window)
+                signature = self._signer.sign(signing_bytes).signature
                 signature_b64 = base64.b64encode(signature).decode()
                 
                 # 设置请求头
                 headers = {
-                    'Content-Type': 'application/json',
-                    'X-API-Key': self.config.api_key,
+                    **self._base_headers,
                     'X-Timestamp': str(timestamp),
-                    'X-Window': str(window),
                     'X-Signature': signature_b64
                 }
                 
@@ -97,12 +150,13 @@ class AssetManager:
                     response = self.session.post(url, headers=headers, json=params, timeout=30)
                 
                 if response.status_code == 200:
-                    return response.json()
+                    return json_loads(response.content)
                 elif response.status_code == 400 and "Request has expired" in response.text:
                     # API请求过期，等待后重试
                     if attempt < max_retries - 1:
-                        self.logger.warning(f"API请求过期，等待1秒后重试 (尝试 {attempt + 1}/{max_retries})")
-                        time.sleep(1)
+                        delay = self._backoff_delay(attempt)
+                        self.logger.warning(f"API请求过期，等待{delay:.2f}秒后重试 (尝试 {attempt + 1}/{max_retries})")
+                        time.sleep(delay)
                         continue
                     else:
                         self.logger.error(f"请求过期重试失败 {endpoint}: {response.status_code} - {response.text}")
@@ -113,8 +167,9 @@ class AssetManager:
                     
             except Exception as e:
                 if attempt < max_retries - 1:
-                    self.logger.warning(f"请求异常，等待1秒后重试 (尝试 {attempt + 1}/{max_retries}): {e}")
-                    time.sleep(1)
+                    delay = self._backoff_delay(attempt)
+                    self.logger.warning(f"请求异常，等待{delay:.2f}秒后重试 (尝试 {attempt + 1}/{max_retries}): {e}")
+                    time.sleep(delay)
                     continue
                 else:
                     self.logger.error(f"请求异常: {e}")
@@ -125,8 +180,13 @@ class AssetManager:
     def get_current_assets(self) -> Dict[str, float]:
         """获取当前资产（包括现货和借贷池）"""
         try:
-            # 使用认证请求获取现货余额
-            balances = self._make_request('GET', '/api/v1/capital', 'balanceQuery')
+            # 并发获取现货余额和抵押品信息（借贷池资产）
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                balances_future = executor.submit(self._make_request, 'GET', '/api/v1/capital', 'balanceQuery')
+                collateral_future = executor.submit(self._make_request, 'GET', '/api/v1/capital/collateral', 'collateralQuery')
+                balances = balances_future.result()
+                collateral_info = collateral_future.result()
+            
             if not balances:
                 self.logger.error("获取现货余额失败")
                 return {}
@@ -139,9 +199,9 @@ class AssetManager:
                     total = float(balance.get('total', 0))
                     if total > 0:
                         current_assets[token] = total
+                self._balance_cache = (dict(current_assets), time.monotonic())
             
-            # 获取抵押品信息（借贷池资产）
-            collateral_info = self._make_request('GET', '/api/v1/capital/collateral', 'collateralQuery')
+            # 合并抵押品信息（借贷池资产）
             if collateral_info and 'collateral' in collateral_info:
                 collateral = collateral_info['collateral']
                 if isinstance(collateral, list):
@@ -166,23 +226,57 @@ class AssetManager:
             self.logger.error(f"获取资产失败: {e}")
             return {}
     
+    def _get_cached_spot_balance(self, token: str) -> Optional[float]:
+        """读取缓存的现货余额，缓存过期时返回None"""
+        balances, fetched_at = self._balance_cache
+        if time.monotonic() - fetched_at > self.config.balance_cache_ttl:
+            return None
+        return balances.get(token, 0.0)
+    
     def get_asset_price(self, symbol: str) -> float:
-        """获取资产价格"""
+        """获取资产价格（短时缓存，同一轮检查内不重复请求）"""
+        cached = self._price_cache.get(symbol)
+        if cached and time.monotonic() - cached[1] < self.config.price_cache_ttl:
+            return cached[0]
+        
         try:
-            ticker = self.session.get(f"{self.config.base_url}/api/v1/ticker", 
-                                    params={'symbol': symbol}).json()
+            response = self.session.get(f"{self.config.base_url}/api/v1/ticker", 
+                                      params={'symbol': symbol})
+            ticker = json_loads(response.content)
             if ticker and 'lastPrice' in ticker:
-                return float(ticker['lastPrice'])
+                price = float(ticker['lastPrice'])
+                self._price_cache[symbol] = (price, time.monotonic())
+                return price
             return 0
         except Exception as e:
             self.logger.error(f"获取价格失败 {symbol}: {e}")
             return 0
     
-    def buy_asset(self, symbol: str, amount_usd: float) -> bool:
-        """买入资产（支持借贷池资产）"""
+    def get_asset_prices(self, assets: List[str]) -> Dict[str, float]:
+        """并发获取多个资产的USDC价格，返回 {交易对: 价格}"""
+        symbols = [f"{asset}_USDC" for asset in assets if asset != 'USDC']
+        if not symbols:
+            return {}
+        
+        max_workers = min(len(symbols), self.config.max_concurrent_requests)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            prices = list(executor.map(self.get_asset_price, symbols))
+        
+        return dict(zip(symbols, prices))
+    
+    def get_assets_and_prices(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """并发获取当前资产和目标资产价格，结果可传给检查/建议方法复用"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assets_future = executor.submit(self.get_current_assets)
+            prices_future = executor.submit(self.get_asset_prices, list(self.config.target_assets))
+            return assets_future.result(), prices_future.result()
+    
+    def buy_asset(self, symbol: str, amount_usd: float, price: Optional[float] = None) -> bool:
+        """买入资产（支持借贷池资产），已知价格时可通过price传入以省去一次查询"""
         try:
             # 获取当前价格
-            price = self.get_asset_price(symbol)
+            if price is None:
+                price = self.get_asset_price(symbol)
             if price <= 0:
                 self.logger.error(f"无法获取 {symbol} 价格")
                 return False
@@ -201,15 +295,29 @@ class AssetManager:
                 self.logger.warning(f"买入数量 {quantity} 小于最小数量 {self.config.min_asset_amount}")
                 return False
             
-            # 尝试两种下单方式
-            # 方式1：使用quoteQuantity（需要现货USDC余额）
-            order_params = {
+            # 两种下单方式
+            # 方式2：使用quantity（可以使用借贷池资产）
+            quantity_params = {
                 'symbol': symbol,
                 'side': 'Bid',
                 'orderType': 'Market',
-                'quoteQuantity': f"{amount_usd:.2f}"  # 使用quoteQuantity指定USDC金额
+                'quantity': f"{quantity:.8f}"  # 使用quantity指定买入数量
             }
             
+            # 缓存的现货USDC余额不足时直接使用方式2，省去一次必然失败的请求
+            spot_usdc = self._get_cached_spot_balance('USDC')
+            if spot_usdc is not None and spot_usdc < amount_usd:
+                self.logger.info(f"💡 现货USDC余额 {spot_usdc:.2f} 不足 {amount_usd:.2f}U，直接使用quantity方式")
+                order_params = quantity_params
+            else:
+                # 方式1：使用quoteQuantity（需要现货USDC余额）
+                order_params = {
+                    'symbol': symbol,
+                    'side': 'Bid',
+                    'orderType': 'Market',
+                    'quoteQuantity': f"{amount_usd:.2f}"  # 使用quoteQuantity指定USDC金额
+                }
+            
             self.logger.info(f"📝 订单参数: {order_params}")
             result = self._make_request('POST', '/api/v1/order', 'orderExecute', order_params)
             
@@ -220,15 +328,10 @@ class AssetManager:
                 status = result.get('status', 'Unknown')
                 self.logger.info(f"✅ 成功买入 {symbol}: {executed_qty} @ {executed_quote}USDC (订单ID: {order_id}, 状态: {status})")
                 return True
-            elif result and 'INSUFFICIENT_FUNDS' in str(result):
-                # 方式2：使用quantity（可以使用借贷池资产）
+            elif order_params is not quantity_params and result and 'INSUFFICIENT_FUNDS' in str(result):
+                # 回退到方式2
                 self.logger.info(f"🔄 quoteQuantity方式失败，尝试quantity方式...")
-                order_params = {
-                    'symbol': symbol,
-                    'side': 'Bid',
-                    'orderType': 'Market',
-                    'quantity': f"{quantity:.8f}"  # 使用quantity指定买入数量
-                }
+                order_params = quantity_params
                 
                 self.logger.info(f"📝 订单参数: {order_params}")
                 result = self._make_request('POST', '/api/v1/order', 'orderExecute', order_params)
@@ -251,13 +354,13 @@ class AssetManager:
             self.logger.error(f"买入资产异常 {symbol}: {e}")
             return False
     
-    def check_and_replenish_assets(self) -> bool:
-        """检查并补足资产（全自动）"""
+    def check_and_replenish_assets(self, snapshot: Optional[Tuple[Dict[str, float], Dict[str, float]]] = None) -> bool:
+        """检查并补足资产（全自动），snapshot为get_assets_and_prices()的结果"""
         try:
             self.logger.info("🔍 开始检查资产状态...")
             
-            # 获取当前资产
-            current_assets = self.get_current_assets()
+            # 同时获取当前资产和所有目标资产价格
+            current_assets, prices = snapshot or self.get_assets_and_prices()
             self.logger.info(f"📊 当前资产: {current_assets}")
             
             # 检查需要补足的资产
@@ -271,7 +374,7 @@ class AssetManager:
                     current_value = current_amount
                 else:
                     symbol = f"{asset}_USDC"
-                    price = self.get_asset_price(symbol)
+                    price = prices.get(symbol, 0)
                     if price > 0:
                         current_value = current_amount * price
                     else:
@@ -293,7 +396,7 @@ class AssetManager:
             # 自动补足资产
             self.logger.info(f"🛒 自动补足 {len(assets_to_buy)} 种资产...")
             
-            success_count = 0
+            buy_plan = []
             for asset, shortage_value in assets_to_buy:
                 if asset == 'USDC':
                     self.logger.info(f"💰 USDC 需要补足 {shortage_value:.2f}U，但无法直接买入USDC")
@@ -305,15 +408,29 @@ class AssetManager:
                 else:
                     buy_amount = 100.0  # 其他资产买入100U
                 
-                symbol = f"{asset}_USDC"
                 self.logger.info(f"🛒 自动买入 {asset}: 金额 {buy_amount:.2f}U")
+                symbol = f"{asset}_USDC"
+                buy_plan.append((asset, symbol, buy_amount, prices[symbol]))
+            
+            success_count = 0
+            if buy_plan:
+                # 并发提交所有买单
+                max_workers = min(len(buy_plan), self.config.max_concurrent_requests)
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(lambda plan: self.buy_asset(*plan[1:]), buy_plan))
                 
-                if self.buy_asset(symbol, buy_amount):
-                    success_count += 1
-                    self.logger.info(f"✅ {asset} 买入成功")
-                    time.sleep(3)  # 等待订单完成
-                else:
-                    self.logger.error(f"❌ 买入 {asset} 失败")
+                bought_symbols = set()
+                for (asset, symbol, _, _), ok in zip(buy_plan, results):
+                    if ok:
+                        success_count += 1
+                        bought_symbols.add(symbol)
+                        self.logger.info(f"✅ {asset} 买入成功")
+                    else:
+                        self.logger.error(f"❌ 买入 {asset} 失败")
+                
+                # 统一等待订单完成
+                if bought_symbols:
+                    self._wait_for_orders_settled(bought_symbols)
             
             self.logger.info(f"📊 自动补足完成: 成功 {success_count}/{len(assets_to_buy)}")
             return success_count > 0
@@ -322,10 +439,22 @@ class AssetManager:
             self.logger.error(f"检查补足资产异常: {e}")
             return False
     
-    def get_asset_recommendations(self) -> Dict[str, str]:
-        """获取资产建议"""
+    def _wait_for_orders_settled(self, symbols, timeout: float = 3.0, poll_interval: float = 0.5) -> bool:
+        """轮询挂单列表，直到指定交易对没有未完成订单或超时"""
+        deadline = time.monotonic() + timeout
+        while True:
+            open_orders = self._make_request('GET', '/api/v1/orders', 'orderQueryAll')
+            if isinstance(open_orders, list) and not any(order.get('symbol') in symbols for order in open_orders):
+                return True
+            if time.monotonic() >= deadline:
+                self.logger.warning(f"⚠️ 等待订单完成超时: {sorted(symbols)}")
+                return False
+            time.sleep(poll_interval)
+    
+    def get_asset_recommendations(self, snapshot: Optional[Tuple[Dict[str, float], Dict[str, float]]] = None) -> Dict[str, str]:
+        """获取资产建议，snapshot为get_assets_and_prices()的结果"""
         try:
-            current_assets = self.get_current_assets()
+            current_assets, prices = snapshot or self.get_assets_and_prices()
             recommendations = {}
             
             for asset, target_value in self.config.target_assets.items():
@@ -336,7 +465,7 @@ class AssetManager:
                     current_value = current_amount
                 else:
                     symbol = f"{asset}_USDC"
-                    price = self.get_asset_price(symbol)
+                    price = prices.get(symbol, 0)
                     if price > 0:
                         current_value = current_amount * price
                     else:
@@ -6,11 +6,40 @@ Backpack交易所网格量化策略
 """
 
 import time
+import json
 import logging
 import random
+import threading
 from typing import Dict, List, Optional, Tuple
-from decimal import Decimal, ROUND_HALF_UP
-import math
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from http_utils import EndpointUnsupportedError, json_loads, TokenBucket
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+try:
+    import websocket
+    HAVE_WEBSOCKET = True
+except ImportError:
+    HAVE_WEBSOCKET = False
+
+# 买卖方向统一为交易所的Bid/Ask（网格内部使用buy/sell）
+_SIDE_KEYS = {'buy': 'bid', 'bid': 'bid', 'sell': 'ask', 'ask': 'ask'}
+
+if HAVE_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def _calc_grid(base_price, spacing, levels):
+        """JIT编译的网格价格计算（cache=True 将编译结果缓存到磁盘）"""
+        out = np.empty(2 * levels)
+        for k in range(levels):
+            out[k] = base_price * (1 - spacing * (k + 1))
+            out[levels + k] = base_price * (1 + spacing * (k + 1))
+        out.sort()
+        return out
 
 class BackpackGridStrategy:
     """Backpack交易所网格交易策略"""
@@ -30,19 +59,50 @@ class BackpackGridStrategy:
         self.grid_spacing = 0.004  # 网格间距 (0.4%)
         self.initial_quantity = 0.05  # 初始交易数量 (SOL) - 降低到0.05SOL
         self.max_grid_levels = 5  # 最大网格层数
+        # 逐单下单/撤单：令牌桶按配置的每秒请求配额限流，线程数只限制同时在途的请求数
+        requests_per_second = getattr(config, 'requests_per_second', 5)
+        self._order_limiter = TokenBucket(rate=requests_per_second, capacity=requests_per_second)
+        self.max_concurrent_orders = requests_per_second
         
         # 价格跟踪
         self.current_price = 0.0
+        self.price_cache_ttl = 2.0  # 价格缓存有效期（秒）
+        # 推送价格有效期（秒）：连接仍在但推送停滞时，过期后回退REST查询
+        self.ws_price_max_age = getattr(config, 'market_cache_max_age', 2.0)
+        self._price_cache = (0.0, 0.0)  # (价格, 获取时间)
         self.grid_prices = []  # 网格价格列表
-        self.grid_orders = {}  # 网格订单字典 {price: order_id}
+        # 网格状态按列存储：升序价格、对应订单ID（None表示未挂单）、方向（0=买, 1=卖）
+        self._prices = np.empty(0)
+        self._order_ids = np.empty(0, dtype=object)
+        self._sides = np.empty(0, dtype=np.int8)
+        
+        # WebSocket行情推送（连接期间价格由推送更新，推送过期时仍回退轮询）
+        self.ws_url = getattr(config, 'ws_url', 'wss://ws.backpack.exchange')
+        self._ws_app = None
+        self._ws_connected = False
+        # 推送触发的网格更新由单个后台线程执行，多次触发合并为一次
+        self._update_event = threading.Event()
+        self._update_thread = None
         
         # 状态跟踪
         self.is_running = False
         self.last_update_time = 0
+        # 网格重建与撤单互斥（可重入：update_grid持锁时会调用initialize_grid）
+        self._update_lock = threading.RLock()
         
         # 日志
         self.logger = logging.getLogger(__name__)
         
+    @property
+    def grid_orders(self) -> Dict[float, str]:
+        """已挂网格订单 {price: order_id}"""
+        placed = np.not_equal(self._order_ids, None)
+        return dict(zip(self._prices[placed].tolist(), self._order_ids[placed].tolist()))
+    
+    def _active_order_count(self) -> int:
+        """已挂网格订单数"""
+        return int(np.count_nonzero(np.not_equal(self._order_ids, None)))
+    
     def calculate_grid_prices(self, base_price: float) -> List[float]:
         """
         计算网格价格
@@ -53,32 +113,178 @@ class BackpackGridStrategy:
         Returns:
             网格价格列表
         """
-        grid_prices = []
+        if HAVE_NUMBA:
+            return _calc_grid(float(base_price), self.grid_spacing, self.max_grid_levels).tolist()
         
-        # 计算买入网格价格（低于当前价格）
-        for i in range(1, self.max_grid_levels + 1):
-            buy_price = base_price * (1 - self.grid_spacing * i)
-            grid_prices.append(buy_price)
-            
-        # 计算卖出网格价格（高于当前价格）
-        for i in range(1, self.max_grid_levels + 1):
-            sell_price = base_price * (1 + self.grid_spacing * i)
-            grid_prices.append(sell_price)
-            
-        return sorted(grid_prices)
+        # 买入网格（低于当前价格）为负偏移，卖出网格（高于当前价格）为正偏移
+        levels = np.arange(1, self.max_grid_levels + 1)
+        offsets = np.concatenate([-levels, levels]) * self.grid_spacing
+        grid_prices = base_price * (1.0 + offsets)
+        
+        return np.sort(grid_prices).tolist()
     
     def get_current_price(self) -> float:
-        """获取当前SOL价格"""
+        """获取当前SOL价格（短时缓存）"""
+        cached_price, cached_at = self._price_cache
+        max_age = self.ws_price_max_age if self._ws_connected else self.price_cache_ttl
+        if cached_price > 0 and time.monotonic() - cached_at < max_age:
+            return cached_price
+        
         try:
             # 获取SOL/USDC价格
             ticker = self.api_client._make_request('GET', '/api/v1/ticker', 'getTicker', {'symbol': 'SOL_USDC'})
             if ticker and 'lastPrice' in ticker:
-                return float(ticker['lastPrice'])
+                price = float(ticker['lastPrice'])
+                self._price_cache = (price, time.monotonic())
+                return price
         except Exception as e:
             self.logger.error(f"获取价格失败: {e}")
             
         return 0.0
     
+    def start_ticker_stream(self, symbol: str = 'SOL_USDC') -> bool:
+        """启动后台WebSocket行情订阅，价格偏离超过半个网格间距时触发网格更新"""
+        if not HAVE_WEBSOCKET:
+            self.logger.warning("未安装websocket-client，继续使用轮询获取价格")
+            return False
+        if self._ws_app is not None:
+            return True
+        
+        def on_open(ws):
+            ws.send(json.dumps({'method': 'SUBSCRIBE', 'params': [f'ticker.{symbol}']}))
+            self._ws_connected = True
+            self.logger.info(f"📡 已订阅行情推送: {symbol}")
+        
+        def on_message(ws, message):
+            try:
+                data = json_loads(message).get('data') or {}
+                if 'c' in data:
+                    self._on_ticker_price(float(data['c']))
+            except Exception as e:
+                self.logger.error(f"处理行情推送失败: {e}")
+        
+        def on_close(ws, *args):
+            self._ws_connected = False
+        
+        def on_error(ws, error):
+            self._ws_connected = False
+            self.logger.warning(f"行情推送连接异常，回退到轮询: {error}")
+        
+        self._ws_app = websocket.WebSocketApp(self.ws_url, on_open=on_open, on_message=on_message,
+                                              on_close=on_close, on_error=on_error)
+        threading.Thread(target=self._ws_app.run_forever, kwargs={'ping_interval': 30, 'reconnect': 5},
+                         daemon=True).start()
+        self._update_thread = threading.Thread(target=self._update_worker, daemon=True)
+        self._update_thread.start()
+        return True
+    
+    def stop_ticker_stream(self):
+        """停止WebSocket行情订阅，并等待后台更新线程退出"""
+        self._ws_connected = False
+        if self._ws_app is not None:
+            self._ws_app.close()
+            self._ws_app = None
+        
+        update_thread, self._update_thread = self._update_thread, None
+        if update_thread is not None and update_thread is not threading.current_thread():
+            self._update_event.set()
+            update_thread.join()
+    
+    def _update_worker(self):
+        """后台网格更新线程：等待推送触发，同一时间只执行一次更新"""
+        while self._update_thread is threading.current_thread():
+            if not self._update_event.wait(timeout=1.0):
+                continue
+            self._update_event.clear()
+            if self.is_running:
+                self.update_grid()
+    
+    def _on_ticker_price(self, price: float):
+        """行情推送回调：更新价格缓存，价格变化足够大时通知后台线程更新网格"""
+        self._price_cache = (price, time.monotonic())
+        if not self.is_running or self.current_price <= 0:
+            return
+        
+        if abs(price - self.current_price) / self.current_price >= self.grid_spacing * 0.5:
+            self._update_event.set()
+    
+    @staticmethod
+    def _build_order_params(side: str, price: float, quantity: float) -> Dict:
+        """构建网格限价单参数"""
+        return {
+            'symbol': 'SOL_USDC',
+            'side': side,
+            'orderType': 'Limit',
+            'quantity': f"{round(quantity, 4):.4f}",
+            'price': f"{round(price, 2):.2f}"
+        }
+    
+    def place_grid_orders_batch(self, orders: List[Tuple[str, float]], quantity: float) -> Optional[List[Optional[str]]]:
+        """
+        一次请求批量下网格订单
+        
+        Args:
+            orders: [(买卖方向, 价格), ...]
+            quantity: 每单数量
+            
+        Returns:
+            与orders一一对应的订单ID列表（失败的订单为None）；只有批量接口不存在（404/405）时返回None
+        """
+        try:
+            batch_params = [self._build_order_params(side, price, quantity) for side, price in orders]
+            result = self.api_client._make_request('POST', '/api/v1/orders', 'orderExecute', batch_params,
+                                                   raise_unsupported=True)
+            
+            if not isinstance(result, list) or len(result) != len(orders):
+                # 超时、5xx等失败时服务端可能已接受订单，只按未成交订单对账，不重新下单
+                self.logger.warning("批量下单结果未知，按未成交订单对账")
+                return self._reconcile_orders(orders)
+            
+            order_ids = []
+            for (side, price), item in zip(orders, result):
+                order_id = (item.get('orderId') or item.get('id')) if isinstance(item, dict) else None
+                if order_id:
+                    self.logger.info(f"网格订单成功: {side} {quantity} SOL @ {price:.2f}")
+                else:
+                    self.logger.error(f"网格订单失败: {side} {quantity} SOL @ {price:.2f} - {item}")
+                order_ids.append(order_id)
+            return order_ids
+            
+        except EndpointUnsupportedError as e:
+            self.logger.warning(f"批量下单接口不可用，回退到逐单下单: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"批量下网格订单异常，按未成交订单对账: {e}")
+            return self._reconcile_orders(orders)
+    
+    def _reconcile_orders(self, orders: List[Tuple[str, float]]) -> List[Optional[str]]:
+        """
+        按未成交订单找回已被服务端接受的网格订单
+        
+        Args:
+            orders: [(买卖方向, 价格), ...]
+            
+        Returns:
+            与orders一一对应的订单ID列表（未找到的订单为None）
+        """
+        open_ids = {}
+        for order in self.get_open_orders():
+            try:
+                key = (_SIDE_KEYS.get(str(order.get('side')).lower()), f"{float(order['price']):.2f}")
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 'id' in order:
+                open_ids.setdefault(key, []).append(order['id'])
+        
+        order_ids = []
+        for side, price in orders:
+            matched = open_ids.get((_SIDE_KEYS.get(side.lower()), f"{round(price, 2):.2f}"))
+            order_ids.append(matched.pop(0) if matched else None)
+        
+        found = sum(order_id is not None for order_id in order_ids)
+        self.logger.info(f"对账完成：{found}/{len(orders)} 个网格订单已在挂单中")
+        return order_ids
+    
     def place_grid_order(self, side: str, price: float, quantity: float) -> Optional[str]:
         """
         下网格订单
@@ -97,14 +303,9 @@ class BackpackGridStrategy:
             quantity = round(quantity, 4)
             
             # 下订单
-            order_params = {
-                'symbol': 'SOL_USDC',
-                'side': side,
-                'orderType': 'Limit',
-                'quantity': f"{quantity:.4f}",
-                'price': f"{price:.2f}"
-            }
+            order_params = self._build_order_params(side, price, quantity)
             
+            self._order_limiter.take()
             result = self.api_client._make_request('POST', '/api/v1/order', 'orderExecute', order_params)
             
             if result and ('orderId' in result or 'id' in result):
@@ -130,6 +331,7 @@ class BackpackGridStrategy:
             是否成功
         """
         try:
+            self._order_limiter.take()
             result = self.api_client._make_request('DELETE', f'/api/v1/order/{order_id}', 'cancelOrder')
             if result:
                 self.logger.info(f"取消订单成功: {order_id}")
@@ -141,6 +343,29 @@ class BackpackGridStrategy:
             self.logger.error(f"取消订单异常: {e}")
             return False
     
+    def bulk_cancel_symbol(self, symbol: str = 'SOL_USDC') -> bool:
+        """
+        一次请求撤销交易对的所有挂单
+        
+        Args:
+            symbol: 交易对
+            
+        Returns:
+            是否成功
+        """
+        try:
+            result = self.api_client._make_request('DELETE', '/api/v1/orders', 'orderCancelAll', {'symbol': symbol})
+            # 没有挂单时接口返回空列表，同样视为成功
+            if result is not None:
+                self.logger.info(f"批量撤单成功: {symbol}")
+                return True
+            else:
+                self.logger.warning(f"批量撤单失败: {symbol}")
+                return False
+        except Exception as e:
+            self.logger.error(f"批量撤单异常: {e}")
+            return False
+    
     def get_open_orders(self) -> List[Dict]:
         """获取未成交订单"""
         try:
@@ -175,6 +400,14 @@ class BackpackGridStrategy:
         Returns:
             是否成功
         """
+        with self._update_lock:
+            # 持锁后再确认策略仍在运行，避免停止撤单后又重新挂单
+            if not self.is_running:
+                return False
+            return self._initialize_grid()
+    
+    def _initialize_grid(self) -> bool:
+        """初始化网格（调用方需持有_update_lock）"""
         try:
             # 获取当前价格
             self.current_price = self.get_current_price()
@@ -184,6 +417,11 @@ class BackpackGridStrategy:
             
             # 计算网格价格
             self.grid_prices = self.calculate_grid_prices(self.current_price)
+            self._prices = np.asarray(self.grid_prices, dtype=np.float64)
+            # 价格升序排列，二分查找当前价格位置即可划分买卖两侧
+            split = np.searchsorted(self._prices, self.current_price)
+            self._sides = (np.arange(len(self._prices)) >= split).astype(np.int8)
+            self._order_ids = np.full(len(self._prices), None, dtype=object)
             
             # 获取账户余额
             balance = self.get_account_balance()
@@ -195,29 +433,41 @@ class BackpackGridStrategy:
             # 清除现有订单
             self.clear_all_orders()
             
-            # 下网格订单
-            orders_placed = 0
+            # 按余额规划网格订单
+            planned_orders = []
+            planned_index = []
             
-            for price in self.grid_prices:
-                if price < self.current_price:
+            for i, (price, side) in enumerate(zip(self.grid_prices, self._sides.tolist())):
+                if side == 0:
                     # 买入订单
                     if usdc_balance >= price * self.initial_quantity:
-                        order_id = self.place_grid_order('buy', price, self.initial_quantity)
-                        if order_id:
-                            self.grid_orders[price] = order_id
-                            orders_placed += 1
-                            usdc_balance -= price * self.initial_quantity
+                        planned_orders.append(('buy', price))
+                        planned_index.append(i)
+                        usdc_balance -= price * self.initial_quantity
                 else:
                     # 卖出订单
                     if sol_balance >= self.initial_quantity:
-                        order_id = self.place_grid_order('sell', price, self.initial_quantity)
-                        if order_id:
-                            self.grid_orders[price] = order_id
-                            orders_placed += 1
-                            sol_balance -= self.initial_quantity
+                        planned_orders.append(('sell', price))
+                        planned_index.append(i)
+                        sol_balance -= self.initial_quantity
+            
+            # 优先一次批量下单；只有批量接口不存在时才并发逐单下单（令牌桶限制请求频率）
+            # 批量请求结果未知时已按挂单对账，本轮不再补单，下次初始化会先撤单再重新挂单
+            orders_placed = 0
+            
+            if planned_orders:
+                order_ids = self.place_grid_orders_batch(planned_orders, self.initial_quantity)
+                if order_ids is None:
+                    with ThreadPoolExecutor(max_workers=self.max_concurrent_orders) as executor:
+                        order_ids = list(executor.map(
+                            lambda order: self.place_grid_order(order[0], order[1], self.initial_quantity),
+                            planned_orders
+                        ))
                 
-                # 避免过于频繁的请求
-                time.sleep(0.1)
+                for i, order_id in zip(planned_index, order_ids):
+                    if order_id:
+                        self._order_ids[i] = order_id
+                        orders_placed += 1
             
             self.logger.info(f"网格初始化完成，共下订单: {orders_placed}")
             return orders_placed > 0
@@ -229,13 +479,17 @@ class BackpackGridStrategy:
     def clear_all_orders(self):
         """清除所有未成交订单"""
         try:
-            open_orders = self.get_open_orders()
-            for order in open_orders:
-                if 'id' in order:
-                    self.cancel_order(order['id'])
-                    time.sleep(0.1)
+            # 优先使用批量撤单接口，一次请求撤销全部挂单
+            if not self.bulk_cancel_symbol('SOL_USDC'):
+                # 批量接口不可用时逐单并发撤单（令牌桶限制请求频率）
+                open_orders = self.get_open_orders()
+                order_ids = [order['id'] for order in open_orders if 'id' in order]
+                
+                if order_ids:
+                    with ThreadPoolExecutor(max_workers=self.max_concurrent_orders) as executor:
+                        list(executor.map(self.cancel_order, order_ids))
             
-            self.grid_orders.clear()
+            self._order_ids[:] = None
             self.logger.info("已清除所有未成交订单")
             
         except Exception as e:
@@ -248,7 +502,14 @@ class BackpackGridStrategy:
         Returns:
             是否成功
         """
+        # 推送触发与轮询触发可能同时发生，正在更新时直接跳过
+        if not self._update_lock.acquire(blocking=False):
+            return True
+        
         try:
+            if not self.is_running:
+                return True
+            
             # 获取当前价格
             new_price = self.get_current_price()
             if new_price <= 0:
@@ -268,6 +529,8 @@ class BackpackGridStrategy:
         except Exception as e:
             self.logger.error(f"更新网格失败: {e}")
             return False
+        finally:
+            self._update_lock.release()
     
     def execute_grid_strategy(self) -> Dict:
         """
@@ -282,12 +545,13 @@ class BackpackGridStrategy:
                 self.is_running = True
                 success = self.initialize_grid()
                 if success:
+                    self.start_ticker_stream()
                     return {
                         'success': True,
                         'action': 'grid_initialized',
                         'message': '网格策略初始化成功',
                         'grid_levels': len(self.grid_prices),
-                        'orders_placed': len(self.grid_orders)
+                        'orders_placed': self._active_order_count()
                     }
                 else:
                     return {
@@ -304,7 +568,7 @@ class BackpackGridStrategy:
                         'action': 'grid_updated',
                         'message': '网格策略更新成功',
                         'grid_levels': len(self.grid_prices),
-                        'orders_placed': len(self.grid_orders)
+                        'orders_placed': self._active_order_count()
                     }
                 else:
                     return {
@@ -336,7 +600,7 @@ class BackpackGridStrategy:
                 'is_running': self.is_running,
                 'current_price': self.current_price,
                 'grid_levels': len(self.grid_prices),
-                'active_orders': len(self.grid_orders),
+                'active_orders': self._active_order_count(),
                 'open_orders': len(open_orders),
                 'balance': balance,
                 'last_update': self.last_update_time
@@ -353,7 +617,10 @@ class BackpackGridStrategy:
         """停止策略"""
         try:
             self.is_running = False
-            self.clear_all_orders()
+            self.stop_ticker_stream()
+            # 等待进行中的网格更新结束后再撤单，防止更新在撤单后重新挂单
+            with self._update_lock:
+                self.clear_all_orders()
             self.logger.info("网格策略已停止")
         except Exception as e:
             self.logger.error(f"停止策略失败: {e}")
@@ -7,20 +7,46 @@ Backpack代币管理工具
 2. 将除SOL外的其他代币卖出成USDC
 """
 
-import requests
-import json
 import time
+import atexit
+import random
 import logging
 import base64
+import shelve
+import threading
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from http_utils import create_requests_session, json_dumps, json_loads, TokenBucket
+from file_utils import start_queue_logging
 import os
+import sys
 
 # 加载环境变量
 load_dotenv()
 
-@dataclass
+# Python 3.10+ 的dataclass支持slots（省去实例__dict__），旧版本保持普通dataclass
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# 按1:1计价的稳定币，无需查询行情
+STABLECOINS = frozenset({'USDC', 'USDT', 'USD', 'PYUSD', 'FDUSD'})
+
+_log_lock = threading.Lock()
+_log_listener = None
+
+def _configure_logging() -> logging.Logger:
+    """模块级日志配置（只执行一次）：记录经队列交给后台线程写文件和控制台"""
+    global _log_listener
+    logger = logging.getLogger(__name__)
+    with _log_lock:
+        if _log_listener is None:
+            _log_listener, _ = start_queue_logging('token_manager.log', logger)
+            atexit.register(_log_listener.stop)
+            logger.propagate = False
+    return logger
+
+@dataclass(**_DATACLASS_SLOTS)
 class TokenBalance:
     """代币余额信息"""
     symbol: str
@@ -29,7 +55,7 @@ class TokenBalance:
     locked_quantity: float
     usd_value: float = 0.0
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class TokenManagerConfig:
     """代币管理器配置"""
     api_key: str = os.getenv('BACKPACK_API_KEY', '')
@@ -37,31 +63,90 @@ class TokenManagerConfig:
     base_url: str = 'https://api.backpack.exchange'
     min_sell_amount: float = 0.001  # 最小卖出数量
     max_retries: int = 3  # 最大重试次数
+    max_concurrent_requests: int = 5  # 同时进行的API请求数上限
+    markets_cache_ttl: float = 300.0  # 交易对列表缓存有效期（秒）
+    tickers_cache_ttl: float = 30.0  # 全量行情缓存有效期（秒）
+    requests_per_second: float = 5.0  # 每秒API请求配额（令牌桶限流）
+    price_cache_file: str = '.pricecache'  # 磁盘价格缓存文件（空字符串表示不使用）
+    price_cache_ttl: float = 30.0  # 磁盘价格缓存有效期（秒）
 
 class BackpackTokenManager:
     """Backpack代币管理器"""
     
     def __init__(self, config: TokenManagerConfig):
         self.config = config
-        self.session = requests.Session()
-        self.session.headers.update({
+        # 连接池：并发查询价格/卖出时复用TCP+TLS连接
+        self.session = create_requests_session({
             'Content-Type': 'application/json',
             'X-API-Key': config.api_key
-        })
+        }, pool_connections=20, pool_maxsize=20, max_retries=0)
         
         # 设置日志
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('token_manager.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        self.logger = _configure_logging()
         
         # 代币价格缓存
         self.price_cache = {}
+        # 交易对缓存 (获取时间, 交易对集合)
+        self._markets_cache = (0.0, set())
+        # 全量行情缓存 (获取时间, {交易对: 最新价})
+        self._tickers_cache = (0.0, {})
+        
+        # 磁盘价格缓存 {代币: (价格, 时间戳)}，进程重启后仍可复用
+        self._price_db_lock = threading.Lock()
+        self._price_db = None
+        if config.price_cache_file:
+            try:
+                self._price_db = shelve.open(config.price_cache_file)
+            except Exception as e:
+                self.logger.warning(f"⚠️ 打开价格缓存文件失败，仅使用内存缓存: {e}")
+        
+        # 令牌桶限流，多线程并发请求共用
+        self._rate_limiter = TokenBucket(rate=config.requests_per_second, capacity=config.requests_per_second)
+    
+    def close(self):
+        """关闭磁盘价格缓存"""
+        with self._price_db_lock:
+            if self._price_db is not None:
+                self._price_db.close()
+                self._price_db = None
+    
+    def _get_cached_disk_price(self, symbol: str) -> Optional[float]:
+        """读取未过期的磁盘缓存价格"""
+        if self._price_db is None:
+            return None
+        with self._price_db_lock:
+            entry = self._price_db.get(symbol) if self._price_db is not None else None
+        if entry and time.time() - entry[1] < self.config.price_cache_ttl:
+            return entry[0]
+        return None
+    
+    def _save_disk_prices(self, prices: Dict[str, float]):
+        """价格写入磁盘缓存"""
+        if self._price_db is None or not prices:
+            return
+        now = time.time()
+        try:
+            with self._price_db_lock:
+                if self._price_db is None:
+                    return
+                for symbol, price in prices.items():
+                    self._price_db[symbol] = (float(price), now)
+                self._price_db.sync()
+        except Exception as e:
+            self.logger.warning(f"⚠️ 写入价格缓存失败: {e}")
+    
+    @staticmethod
+    def _backoff_delay(attempt: int, base: float = 0.1, cap: float = 10.0) -> float:
+        """指数退避+随机抖动"""
+        return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+    
+    @classmethod
+    def _retry_after_delay(cls, response, attempt: int) -> float:
+        """429时优先使用服务端Retry-After，无法解析则指数退避"""
+        try:
+            return max(0.0, float(response.headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return cls._backoff_delay(attempt)
         
     def _make_request(self, method: str, endpoint: str, operation: str, data: dict = None, max_retries: int = 3) -> Optional[dict]:
         """发送API请求 - 使用与主脚本相同的方式"""
@@ -69,18 +154,29 @@ class BackpackTokenManager:
         
         for attempt in range(max_retries):
             try:
+                self._rate_limiter.take()
+                
                 if method.upper() == 'GET':
                     response = self.session.get(url, params=data)
                 else:
-                    response = self.session.post(url, json=data)
+                    body = json_dumps(data) if data is not None else None
+                    response = self.session.post(url, data=body)
                 
                 if response.status_code == 200:
-                    return response.json()
+                    return json_loads(response.content)
+                elif response.status_code == 429:
+                    if attempt < max_retries - 1:
+                        delay = self._retry_after_delay(response, attempt)
+                        self.logger.warning(f"触发限流，{delay:.2f}秒后重试 {attempt + 1}/{max_retries}")
+                        time.sleep(delay)
+                        continue
+                    self.logger.error(f"请求被限流 {endpoint}: {response.status_code} - {response.text}")
+                    return None
                 elif response.status_code == 400:
                     error_text = response.text
                     if "Request has expired" in error_text:
                         self.logger.warning(f"请求过期，重试 {attempt + 1}/{max_retries}")
-                        time.sleep(1)
+                        time.sleep(self._backoff_delay(attempt))
                         continue
                     else:
                         self.logger.error(f"请求失败 {endpoint}: {response.status_code} - {error_text}")
@@ -92,7 +188,7 @@ class BackpackTokenManager:
             except Exception as e:
                 self.logger.error(f"请求异常 {endpoint}: {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(1)
+                    time.sleep(self._backoff_delay(attempt))
                     continue
                 return None
         
@@ -103,33 +199,53 @@ class BackpackTokenManager:
         try:
             self.logger.info("🔍 查询账户所有代币余额...")
             
+            # 一次请求加载全部行情，后续估值只查字典
+            tickers = self._load_all_tickers()
+            
             # 获取账户余额
             balance_data = self._make_request('GET', '/api/v1/capital', 'getBalance')
             if not balance_data or 'balances' not in balance_data:
                 self.logger.error("❌ 获取账户余额失败")
                 return []
             
+            assets = [
+                (asset.get('symbol', ''),
+                 float(asset.get('totalQuantity', 0)),
+                 float(asset.get('availableQuantity', 0)),
+                 float(asset.get('lockedQuantity', 0)))
+                for asset in balance_data['balances']
+            ]
+            
+            if tickers:
+                # 全量行情已加载：逐个查字典估值，直接USDC交易对，缺失时用BTC/ETH交叉汇率补齐
+                usd_values = []
+                priced = {}
+                for symbol, total_quantity, _, _ in assets:
+                    price = self._ticker_price(symbol)
+                    if price is None:
+                        usd_values.append(0.0)
+                        continue
+                    if symbol not in STABLECOINS:
+                        priced[symbol] = price
+                    usd_values.append(price * total_quantity)
+                self.price_cache.update(priced)
+                self._save_disk_prices(priced)
+            else:
+                # 全量行情不可用时并发逐个查询价格，零余额无需定价
+                usd_values = [0.0] * len(assets)
+                held = [i for i, asset in enumerate(assets) if asset[1] > 0]
+                if held:
+                    max_workers = min(len(held), self.config.max_concurrent_requests)
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        prices = executor.map(lambda i: self._get_token_price(assets[i][0], assets[i][1]), held)
+                        for i, usd_value in zip(held, prices):
+                            usd_values[i] = usd_value
+            
             balances = []
             total_usd_value = 0.0
             
-            for asset in balance_data['balances']:
-                symbol = asset.get('symbol', '')
-                total_quantity = float(asset.get('totalQuantity', 0))
-                available_quantity = float(asset.get('availableQuantity', 0))
-                locked_quantity = float(asset.get('lockedQuantity', 0))
-                
-                # 获取代币价格
-                usd_value = self._get_token_price(symbol, total_quantity)
-                
-                balance = TokenBalance(
-                    symbol=symbol,
-                    total_quantity=total_quantity,
-                    available_quantity=available_quantity,
-                    locked_quantity=locked_quantity,
-                    usd_value=usd_value
-                )
-                
-                balances.append(balance)
+            for (symbol, total_quantity, available_quantity, locked_quantity), usd_value in zip(assets, usd_values):
+                balances.append(TokenBalance(symbol, total_quantity, available_quantity, locked_quantity, usd_value))
                 total_usd_value += usd_value
                 
                 if total_quantity > 0:
@@ -142,34 +258,86 @@ class BackpackTokenManager:
             self.logger.error(f"获取代币余额失败: {e}")
             return []
     
+    def _load_all_tickers(self) -> Dict[str, float]:
+        """通过 /api/v1/tickers 一次加载全部交易对最新价（带TTL缓存），失败时返回空字典"""
+        fetched_at, tickers = self._tickers_cache
+        if tickers and time.monotonic() - fetched_at < self.config.tickers_cache_ttl:
+            return tickers
+        
+        data = self._make_request('GET', '/api/v1/tickers', 'getTickers')
+        if not isinstance(data, list):
+            self.logger.warning("⚠️ 获取全量行情失败，回退到逐个查询")
+            return {}
+        
+        tickers = {item['symbol']: float(item['lastPrice']) for item in data if 'lastPrice' in item}
+        self._tickers_cache = (time.monotonic(), tickers)
+        # 行情刷新后，之前按代币缓存的价格随之失效
+        self.price_cache = {}
+        return tickers
+    
+    def _ticker_price(self, symbol: str) -> Optional[float]:
+        """按全量行情计算代币的USDC价格，规则与 _get_token_price 一致，无法定价时返回None"""
+        if symbol in STABLECOINS:
+            return 1.0
+        price = self._lookup_price(f'{symbol}_USDC')
+        if price is not None:
+            return price
+        for base in ['BTC', 'ETH']:
+            if symbol != base:
+                symbol_price = self._lookup_price(f'{symbol}_{base}')
+                base_price = self._lookup_price(f'{base}_USDC') if symbol_price is not None else None
+                if base_price is not None:
+                    return symbol_price * base_price
+        return None
+    
+    def _lookup_price(self, trading_pair: str) -> Optional[float]:
+        """查询交易对最新价：优先读全量行情缓存，未加载时单独请求"""
+        fetched_at, tickers = self._tickers_cache
+        if tickers and time.monotonic() - fetched_at < self.config.tickers_cache_ttl:
+            return tickers.get(trading_pair)
+        
+        ticker_data = self._make_request('GET', '/api/v1/ticker', 'getTicker', {'symbol': trading_pair})
+        if ticker_data and 'lastPrice' in ticker_data:
+            return float(ticker_data['lastPrice'])
+        return None
+    
     def _get_token_price(self, symbol: str, quantity: float) -> float:
         """获取代币价格"""
         try:
+            # 稳定币按1:1计价，零余额无需定价
+            if symbol in STABLECOINS:
+                return quantity
+            if quantity == 0:
+                return 0.0
+            
             if symbol in self.price_cache:
                 return self.price_cache[symbol] * quantity
             
+            # 磁盘缓存未过期时直接使用
+            price = self._get_cached_disk_price(symbol)
+            if price is not None:
+                self.price_cache[symbol] = price
+                return price * quantity
+            
             # 获取代币价格
-            ticker_data = self._make_request('GET', '/api/v1/ticker', 'getTicker', {'symbol': f'{symbol}_USDC'})
-            if ticker_data and 'lastPrice' in ticker_data:
-                price = float(ticker_data['lastPrice'])
+            price = self._lookup_price(f'{symbol}_USDC')
+            if price is not None:
                 self.price_cache[symbol] = price
+                self._save_disk_prices({symbol: price})
                 return price * quantity
             
-            # 如果直接获取失败，尝试其他交易对
-            if symbol != 'USDC':
-                # 尝试通过BTC或ETH获取价格
-                for base in ['BTC', 'ETH']:
-                    if symbol != base:
-                        ticker_data = self._make_request('GET', '/api/v1/ticker', 'getTicker', {'symbol': f'{symbol}_{base}'})
-                        if ticker_data and 'lastPrice' in ticker_data:
-                            symbol_price = float(ticker_data['lastPrice'])
-                            # 获取基础代币对USDC的价格
-                            base_ticker = self._make_request('GET', '/api/v1/ticker', 'getTicker', {'symbol': f'{base}_USDC'})
-                            if base_ticker and 'lastPrice' in base_ticker:
-                                base_price = float(base_ticker['lastPrice'])
-                                price = symbol_price * base_price
-                                self.price_cache[symbol] = price
-                                return price * quantity
+            # 如果直接获取失败，尝试通过BTC或ETH获取价格
+            for base in ['BTC', 'ETH']:
+                if symbol != base:
+                    symbol_price = self._lookup_price(f'{symbol}_{base}')
+                    if symbol_price is not None:
+                        # 获取基础代币对USDC的价格
+                        base_price = self._lookup_price(f'{base}_USDC')
+                        if base_price is not None:
+                            price = symbol_price * base_price
+                            self.price_cache[symbol] = price
+                            self._save_disk_prices({symbol: price})
+                            return price * quantity
             
             return 0.0
             
@@ -202,22 +370,38 @@ class BackpackTokenManager:
             
             self.logger.info(f"📋 需要卖出的代币: {[token.symbol for token in tokens_to_sell]}")
             
-            # 执行卖出操作
-            sell_results = {}
-            for token in tokens_to_sell:
-                success = self._sell_token(token)
-                sell_results[token.symbol] = success
-                
-                # 避免过于频繁的请求
-                time.sleep(1)
+            # 交易对列表只获取一次，所有卖出共用
+            market_symbols = self._get_market_symbols()
+            if not market_symbols:
+                self.logger.error(f"❌ 无法获取市场信息")
+                return {token.symbol: False for token in tokens_to_sell}
             
-            return sell_results
+            # 并发执行卖出操作（并发数限制请求频率）
+            max_workers = min(len(tokens_to_sell), self.config.max_concurrent_requests)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(lambda token: self._sell_token(token, market_symbols), tokens_to_sell))
+            
+            return {token.symbol: success for token, success in zip(tokens_to_sell, results)}
             
         except Exception as e:
             self.logger.error(f"卖出代币失败: {e}")
             return {}
     
-    def _sell_token(self, token: TokenBalance) -> bool:
+    def _get_market_symbols(self) -> set:
+        """获取所有交易对名称集合（带TTL缓存）"""
+        fetched_at, symbols = self._markets_cache
+        if symbols and time.monotonic() - fetched_at < self.config.markets_cache_ttl:
+            return symbols
+        
+        markets = self._make_request('GET', '/api/v1/markets', 'getMarkets')
+        if not markets:
+            return set()
+        
+        symbols = {market.get('symbol') for market in markets}
+        self._markets_cache = (time.monotonic(), symbols)
+        return symbols
+    
+    def _sell_token(self, token: TokenBalance, market_symbols: set) -> bool:
         """卖出单个代币"""
         try:
             symbol = token.symbol
@@ -225,31 +409,14 @@ class BackpackTokenManager:
             
             self.logger.info(f"🔄 卖出 {symbol}: {quantity:.6f}")
             
-            # 检查交易对是否存在
-            trading_pair = f"{symbol}_USDC"
-            markets = self._make_request('GET', '/api/v1/markets', 'getMarkets')
-            if not markets:
-                self.logger.error(f"❌ 无法获取市场信息")
-                return False
-            
             # 检查交易对是否支持
-            market_exists = False
-            for market in markets:
-                if market.get('symbol') == trading_pair:
-                    market_exists = True
-                    break
-            
-            if not market_exists:
+            trading_pair = f"{symbol}_USDC"
+            if trading_pair not in market_symbols:
                 self.logger.warning(f"⚠️ 交易对 {trading_pair} 不存在，跳过 {symbol}")
                 return False
             
-            # 获取当前价格
-            ticker = self._make_request('GET', '/api/v1/ticker', 'getTicker', {'symbol': trading_pair})
-            if not ticker or 'lastPrice' not in ticker:
-                self.logger.error(f"❌ 无法获取 {symbol} 价格")
-                return False
-            
-            current_price = float(ticker['lastPrice'])
+            # 参考价格取自余额查询时的估值，不再单独请求行情
+            current_price = token.usd_value / token.total_quantity if token.total_quantity > 0 else 0.0
             
             # 使用市价单卖出
             order_params = {
@@ -298,6 +465,7 @@ def show_menu():
 
 def main():
     """主函数"""
+    manager = None
     try:
         # 创建配置
         config = TokenManagerConfig()
@@ -365,6 +533,9 @@ def main():
         print("\n\n👋 用户中断，退出程序")
     except Exception as e:
         print(f"\n❌ 程序异常: {e}")
+    finally:
+        if manager is not None:
+            manager.close()
 
 if __name__ == "__main__":
     main()
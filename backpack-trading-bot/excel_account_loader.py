@@ -5,12 +5,16 @@ Excel账户加载器
 从xlsx文件中读取账户信息和API密钥，自动生成多账户配置
 """
 
-import pandas as pd
-import json
 import os
+from itertools import cycle, repeat
+from openpyxl import load_workbook
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 from multi_account_farming import AccountConfig, ProxyConfig, MultiAccountConfig
+from http_utils import json_dumps
+
+# 不使用代理时所有账户共用的禁用代理配置
+_DISABLED_PROXY = ProxyConfig(enabled=False, gateway="", port=0, username="", password="")
 
 @dataclass
 class ExcelAccountData:
@@ -35,46 +39,51 @@ class ExcelAccountLoader:
                 print(f"❌ Excel文件不存在: {self.excel_file}")
                 return False
             
-            # 读取Excel文件
-            df = pd.read_excel(self.excel_file)
-            print(f"✅ 成功读取Excel文件: {self.excel_file}")
-            print(f"   数据行数: {len(df)}")
-            print(f"   列名: {df.columns.tolist()}")
-            
-            # 解析数据
-            self.accounts_data = []
-            for index, row in df.iterrows():
-                try:
-                    # 获取账户信息
-                    account_name = str(row.get('account', f'account_{index+1}'))
-                    api_key = str(row.get('API Key', ''))
-                    api_secret = str(row.get('API Secret', ''))
-                    
-                    # 清理数据
-                    if api_secret == 'nan' or api_secret == 'NaN':
-                        api_secret = ''
+            # 只读模式流式读取Excel文件
+            wb = load_workbook(self.excel_file, read_only=True, data_only=True)
+            try:
+                rows = wb.active.iter_rows(values_only=True)
+                header = [str(name) if name is not None else '' for name in next(rows, ())]
+                print(f"✅ 成功读取Excel文件: {self.excel_file}")
+                print(f"   列名: {header}")
+                
+                # 列位置只解析一次，缺失的列取值恒为None
+                col_idx = {name: i for i, name in enumerate(header)}
+                name_col, key_col, secret_col = (col_idx.get(c) for c in ('account', 'API Key', 'API Secret'))
+                
+                def cell(row, i):
+                    return row[i] if i is not None and i < len(row) else None
+                
+                # 解析数据（空单元格为None）
+                self.accounts_data = []
+                row_count = 0
+                for index, row in enumerate(rows):
+                    if all(value is None for value in row):
+                        continue
+                    row_count += 1
                     
                     # 验证必要字段
-                    if not api_key:
+                    api_key = cell(row, key_col)
+                    if api_key is None or api_key == '':
                         print(f"⚠️ 第{index+1}行缺少API Key，跳过")
                         continue
                     
-                    # 创建账户数据
-                    account_data = ExcelAccountData(
-                        account_name=account_name,
-                        api_key=api_key,
-                        api_secret=api_secret,
-                        email=account_name if '@' in account_name else '',
-                        enabled=True
-                    )
+                    account_name = cell(row, name_col)
+                    account_name = str(account_name) if account_name is not None else f'account_{index+1}'
+                    api_secret = cell(row, secret_col)
                     
-                    self.accounts_data.append(account_data)
+                    self.accounts_data.append(ExcelAccountData(
+                        account_name,
+                        str(api_key),
+                        str(api_secret) if api_secret is not None else '',
+                        account_name if '@' in account_name else '',
+                        True
+                    ))
                     print(f"✅ 加载账户: {account_name}")
-                    
-                except Exception as e:
-                    print(f"❌ 解析第{index+1}行数据失败: {e}")
-                    continue
+            finally:
+                wb.close()
             
+            print(f"   数据行数: {row_count}")
             print(f"✅ 成功加载 {len(self.accounts_data)} 个账户")
             return len(self.accounts_data) > 0
             
@@ -153,21 +162,16 @@ class ExcelAccountLoader:
             proxy_configs = self.generate_default_proxy_configs(len(self.accounts_data))
         else:
             # 不使用代理
-            proxy_configs = [
-                ProxyConfig(
-                    enabled=False,
-                    gateway="",
-                    port=0,
-                    username="",
-                    password=""
-                )
-            ]
+            proxy_configs = []
+        
+        # 代理循环分配；没有可用代理时统一使用禁用代理
+        proxy_pool = cycle(proxy_configs) if proxy_configs else repeat(_DISABLED_PROXY)
         
         # 创建账户配置
         account_configs = []
         for i, account_data in enumerate(self.accounts_data):
             # 选择代理（循环使用）
-            proxy_config = proxy_configs[i % len(proxy_configs)]
+            proxy_config = next(proxy_pool)
             
             account_config = AccountConfig(
                 account_id=f"account_{i+1}",
@@ -235,9 +239,13 @@ class ExcelAccountLoader:
                 }
                 config_dict["accounts"].append(account_dict)
             
-            # 保存到文件
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(config_dict, f, ensure_ascii=False, indent=2)
+            # 保存到文件：先写临时文件再原子替换，避免中途失败留下不完整的配置
+            content = json_dumps(config_dict, indent=True)
+            
+            tmp_filename = f"{filename}.tmp"
+            with open(tmp_filename, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_filename, filename)
             
             print(f"✅ 配置已保存到: {filename}")
             return True
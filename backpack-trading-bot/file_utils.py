@@ -6,7 +6,17 @@
 
 import os
 import sys
-from typing import Optional
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime
+from typing import Optional, Tuple
+
+# 日志文件句柄复用 {文件名: 文件对象}，避免每条日志都打开/关闭文件（行缓冲，每条日志写入后立即可见）
+_log_handles = {}
+_log_lock = threading.Lock()
 
 def write_pid_file(pid: int, filename: str = "backpack_farming.pid") -> bool:
     """
@@ -20,9 +30,11 @@ def write_pid_file(pid: int, filename: str = "backpack_farming.pid") -> bool:
         bool: 是否成功写入
     """
     try:
-        # 使用UTF-8编码，不添加BOM
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(str(pid))
+        # 写入ASCII字节（不添加BOM），先写临时文件再原子替换，避免残留半截文件
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, 'wb') as f:
+            f.write(str(pid).encode('ascii'))
+        os.replace(tmp_filename, filename)
         return True
     except Exception as e:
         print(f"写入PID文件失败: {e}")
@@ -42,26 +54,26 @@ def read_pid_file(filename: str = "backpack_farming.pid") -> Optional[int]:
         return None
     
     try:
-        # 尝试不同的编码方式
-        encodings = ['utf-8-sig', 'utf-8', 'gbk', 'cp1252']
+        # 只读取一次原始字节，之后都在内存中解码
+        with open(filename, 'rb') as f:
+            raw = f.read()
+        
+        # 常见情况：ASCII数字（可能带UTF-8 BOM），直接解析
+        raw = raw.lstrip(b'\xef\xbb\xbf').strip()
+        try:
+            return int(raw)
+        except ValueError:
+            pass
         
-        for encoding in encodings:
+        # 异常文件再依次尝试其他编码
+        for encoding in ('utf-8', 'gbk', 'cp1252'):
             try:
-                with open(filename, 'r', encoding=encoding) as f:
-                    content = f.read().strip()
-                    # 移除可能的BOM字符
-                    if content.startswith('\ufeff'):
-                        content = content[1:]
-                    return int(content)
+                return int(raw.decode(encoding).strip().lstrip('\ufeff'))
             except (UnicodeDecodeError, ValueError):
                 continue
         
-        # 如果所有编码都失败，尝试二进制读取
-        with open(filename, 'rb') as f:
-            content = f.read().decode('utf-8', errors='ignore').strip()
-            if content.startswith('\ufeff'):
-                content = content[1:]
-            return int(content)
+        # 如果所有编码都失败，忽略无法解码的字节
+        return int(raw.decode('utf-8', errors='ignore').strip())
             
     except Exception as e:
         print(f"读取PID文件失败: {e}")
@@ -97,17 +109,61 @@ def write_log_file(message: str, filename: str = "background_farming.log") -> bo
         bool: 是否成功写入
     """
     try:
-        from datetime import datetime
-        timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        log_message = f"{timestamp} {message}\n"
+        log_message = datetime.now().strftime("[%Y-%m-%d %H:%M:%S] ") + f"{message}\n"
         
-        with open(filename, 'a', encoding='utf-8') as f:
-            f.write(log_message)
+        with _log_lock:
+            handle = _log_handles.get(filename)
+            if handle is None:
+                handle = _log_handles[filename] = open(filename, 'a', encoding='utf-8', buffering=1)
+            handle.write(log_message)
         return True
     except Exception as e:
         print(f"写入日志文件失败: {e}")
         return False
 
+def flush_log_files():
+    """将缓冲的日志写入磁盘"""
+    with _log_lock:
+        for handle in _log_handles.values():
+            handle.flush()
+
+def close_log_files():
+    """刷新并关闭所有日志文件句柄"""
+    with _log_lock:
+        for handle in _log_handles.values():
+            handle.close()
+        _log_handles.clear()
+
+atexit.register(close_log_files)
+
+def start_queue_logging(filename: str, logger: Optional[logging.Logger] = None
+                        ) -> Tuple[logging.handlers.QueueListener, Tuple[logging.Handler, ...]]:
+    """
+    为logger（默认根日志）配置队列日志：调用线程只把记录放入队列，由后台线程写文件和控制台
+    
+    Args:
+        filename: 日志文件名
+        logger: 要配置的logger，None表示根日志
+        
+    Returns:
+        (已启动的QueueListener, (文件处理器, 控制台处理器))；停止监听由调用方负责
+    """
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(filename, encoding='utf-8')
+    stream_handler = logging.StreamHandler()
+    file_handler.setFormatter(formatter)
+    stream_handler.setFormatter(formatter)
+    handlers = (file_handler, stream_handler)
+    
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    
+    logger = logger if logger is not None else logging.getLogger()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    return listener, handlers
+
 def get_system_info() -> dict:
     """
     获取系统信息，用于诊断问题
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP公共工具
+JSON编解码、HTTP客户端工厂和限流器等各模块共用的网络请求组件
+"""
+
+import json
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx的HTTP/2支持依赖h2
+    HAVE_HTTPX = True
+except ImportError:
+    HAVE_HTTPX = False
+
+# 响应解析优先使用orjson（C实现），未安装时回退到标准库
+json_loads = orjson.loads if HAVE_ORJSON else json.loads
+
+def json_dumps(obj, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON字节串，indent为True时缩进2格"""
+    if HAVE_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+# 接口不存在或不支持该请求方法的状态码：只有这两种响应能确定服务端没有处理请求
+UNSUPPORTED_STATUSES = (404, 405)
+
+class EndpointUnsupportedError(Exception):
+    """接口不存在或不支持该请求方法（HTTP 404/405）"""
+
+# 幂等GET请求的重试策略：瞬时故障（连接重置、限流、5xx）指数退避重试（Retry对象不可变，可共用）
+GET_RETRY = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET',), respect_retry_after_header=True, raise_on_status=False)
+
+def create_requests_session(headers: dict = None, pool_connections: int = 10, pool_maxsize: int = 20,
+                            max_retries=GET_RETRY) -> requests.Session:
+    """创建带连接池的requests会话（需要代理、原始请求体等requests特性的签名接口也使用它）"""
+    session = requests.Session()
+    session.headers['Connection'] = 'keep-alive'
+    if headers:
+        session.headers.update(headers)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def create_session(headers: dict = None, pool_connections: int = 10, pool_maxsize: int = 20):
+    """
+    创建公共接口的HTTP客户端，同一主机的请求复用keep-alive连接
+    
+    安装了httpx时使用HTTP/2（并发请求复用同一个TLS连接），否则使用requests连接池
+    """
+    if HAVE_HTTPX:
+        # 连接参数需设置在transport上；retries只重试连接失败
+        transport = httpx.HTTPTransport(
+            http2=True,
+            retries=3,
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_connections)
+        )
+        return httpx.Client(headers=headers, timeout=10.0, transport=transport)
+    
+    return create_requests_session(headers, pool_connections, pool_maxsize)
+
+class TokenBucket:
+    """线程安全的令牌桶限流器：rate为每秒补充的令牌数，capacity为最大突发量"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def take(self, n: float = 1):
+        """取n个令牌，配额用尽时等待补充"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
@@ -14,17 +14,43 @@ Backpack智能刷分系统 - 网格量化策略版
 
 import asyncio
 import json
+import atexit
 import logging
+import math
 import random
+import threading
 import time
+from collections import deque
+from functools import partial
+from itertools import accumulate
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-import pandas as pd
-import requests
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib3.util.retry import Retry
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import os
 from backpack_grid_strategy import BackpackGridStrategy
+from http_utils import UNSUPPORTED_STATUSES, EndpointUnsupportedError, create_requests_session, json_loads
+from file_utils import start_queue_logging
+
+try:
+    import websocket
+    HAVE_WEBSOCKET = True
+except ImportError:
+    HAVE_WEBSOCKET = False
+
+_log_listener = None
+
+def _configure_logging():
+    """根日志配置（与basicConfig一样只在未配置时生效）：记录经队列交给后台线程写文件和控制台"""
+    global _log_listener
+    root = logging.getLogger()
+    if _log_listener is not None or root.handlers:
+        return
+    
+    _log_listener, _ = start_queue_logging('points_farming.log')
+    atexit.register(_log_listener.stop)
 
 # 加载环境变量
 load_dotenv()
@@ -36,6 +62,7 @@ class PointsFarmingConfig:
     api_key: str = os.getenv('BACKPACK_API_KEY', '')
     private_key: str = os.getenv('BACKPACK_PRIVATE_KEY', '')
     base_url: str = 'https://api.backpack.exchange'
+    ws_url: str = 'wss://ws.backpack.exchange'
     
     # 交易配置 - 只交易SOL
     trading_pairs: List[str] = None
@@ -51,6 +78,10 @@ class PointsFarmingConfig:
     daily_cycles: int = 24  # 每日执行轮数 (每小时一次)
     cycle_duration: int = 3600  # 每轮持续时间 (秒)
     operation_interval: Tuple[int, int] = (10, 30)  # 操作间隔 (秒)
+    requests_per_second: int = 5  # 每秒API请求配额（网格并发下单/撤单上限）
+    balance_cache_ttl: float = 10.0  # 账户余额缓存有效期（秒）
+    market_cache_max_age: float = 2.0  # 行情推送缓存有效期（秒），过期回退HTTP查询
+    request_timeout: float = 15.0  # 单次HTTP请求超时（秒）
     
     # 操作权重配置
     trading_weight: float = 0.4  # 交易操作权重
@@ -63,27 +94,47 @@ class PointsFarmingConfig:
         if self.trading_pairs is None:
             self.trading_pairs = ["SOL_USDC"]  # 只交易SOL
 
+class OpRecord(NamedTuple):
+    """操作记录（元组布局，比dict更省内存）"""
+    timestamp: float  # time.time()时间戳
+    type: str
+    details: str
+
 class IntelligentPointsFarmer:
     """智能积分刷取系统 - 网格量化策略版"""
     
+    # 只读查询表: 键 -> (操作名称, 端点, 指令, 是否按交易对查询, 推送缓存的频道)
+    _QUERY_TABLE = {
+        'markets': ('查询市场信息', '/api/v1/markets', 'queryMarkets', False, None),
+        'ticker': ('查询价格数据', '/api/v1/ticker', 'queryTicker', True, 'ticker'),
+        'depth': ('查询订单簿', '/api/v1/depth', 'queryOrderbook', True, 'depth'),
+        'trades': ('查询交易记录', '/api/v1/trades', 'queryTrades', True, None),
+        'collateral': ('查询抵押品信息', '/api/v1/capital', 'queryCollateral', False, None),
+        'lending_pool': ('查询借贷池信息', '/api/v1/capital', 'queryLendingPool', False, None),  # 模拟借贷池查询
+        'account_info': ('查询账户信息', '/api/v1/capital', 'queryAccountInfo', False, None),
+        'balance': ('查询余额信息', '/api/v1/capital', 'queryBalance', False, None),
+        'system_status': ('查询系统状态', '/api/v1/system/status', 'querySystemStatus', False, None),
+    }
+    
     def __init__(self, config: PointsFarmingConfig):
         self.config = config
-        self.session = requests.Session()
-        self.session.headers.update({
+        # 连接池：复用TLS连接，网格并发下单时不会因连接池过小而重新握手
+        # 连接失败和网关错误交给urllib3在同一连接池内退避重试（POST不重试读超时，避免重复下单）
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), raise_on_status=False)
+        self.session = create_requests_session({
             'Content-Type': 'application/json',
             'X-API-Key': config.api_key
-        })
+        }, pool_connections=32, pool_maxsize=64, max_retries=retry)
         self.proxy_url = None  # 代理URL
         
+        # 常用端点的完整URL只拼接一次
+        self._endpoints = {endpoint: config.base_url + endpoint for endpoint in (
+            '/api/v1/capital', '/api/v1/markets', '/api/v1/ticker',
+            '/api/v1/depth', '/api/v1/trades', '/api/v1/system/status'
+        )}
+        
         # 设置日志
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('points_farming.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        _configure_logging()
         self.logger = logging.getLogger(__name__)
         
         # 统计信息
@@ -97,10 +148,18 @@ class IntelligentPointsFarmer:
             'start_time': datetime.now(),
             'last_cycle_time': None
         }
+        # execute_other_operations并发执行操作，计数器的读-改-写需要加锁
+        self._stats_lock = threading.Lock()
         
         # 盈亏监控
         self.pnl_data_file = "pnl_data.json"
         self.initial_balance = None
+        self._tracked_assets = frozenset({'SOL', 'USDC', 'BTC', 'ETH'})  # 计入余额的资产
+        self._balance_cache = (0.0, None)  # (获取时间, 余额)
+        
+        # 行情推送缓存：{'ticker.SOL_USDC': (数据, 接收时间)}
+        self._market_cache: Dict[str, Tuple[dict, float]] = {}
+        self._market_ws = None
         
         # 每日统计
         self.daily_stats = {
@@ -111,14 +170,49 @@ class IntelligentPointsFarmer:
             'points_earned': 0
         }
         
-        # 操作历史
-        self.operation_history = []
+        # 操作历史（只保留最近1000条，超出时自动丢弃最旧的记录）
+        self.operation_history = deque(maxlen=1000)
         
         # 持仓跟踪（用于止盈止损）
         self.positions = {}  # {symbol: {'side': 'long'/'short', 'entry_price': float, 'quantity': float, 'entry_time': datetime}}
         
         # 网格策略实例
         self.grid_strategy = BackpackGridStrategy(self, config)
+        
+        # 周期操作及其累积权重（权重固定，只计算一次）
+        self._cycle_ops = [
+            ('网格交易', self.execute_diversified_trading),
+            ('数据查询', self.execute_data_queries),
+            ('账户活动', self.execute_account_activities),
+            ('借贷操作', self.execute_lending_operations),
+            ('功能使用', self.execute_feature_usage)
+        ]
+        self._cycle_cum_weights = list(accumulate([
+            config.trading_weight,
+            config.data_query_weight,
+            config.account_activity_weight,
+            config.lending_weight,
+            config.feature_usage_weight
+        ]))
+        
+        # 各类操作的候选列表固定不变，预先构建
+        def query_op(key):
+            return self._QUERY_TABLE[key][0], partial(self._query, key)
+        
+        self._data_query_ops = tuple(map(query_op, ('markets', 'ticker', 'depth', 'trades')))
+        self._lending_ops = tuple(map(query_op, ('collateral', 'lending_pool')))
+        self._account_ops = tuple(map(query_op, ('account_info', 'balance', 'system_status')))
+        self._feature_ops = (query_op('system_status'), ('测试API端点', self._test_api_endpoints))
+        
+        self._other_ops = (
+            ('数据查询', self.execute_data_queries),
+            ('账户活动', self.execute_account_activities),
+            ('借贷操作', self.execute_lending_operations),
+            ('功能使用', self.execute_feature_usage)
+        )
+        
+        # 只有一个交易对时无需随机选择
+        self._sole_pair = config.trading_pairs[0] if len(config.trading_pairs) == 1 else None
     
     def set_proxy(self, proxy_url: str):
         """设置代理"""
@@ -130,19 +224,29 @@ class IntelligentPointsFarmer:
             }
             self.logger.info(f"已设置代理: {proxy_url}")
     
-    def _make_request(self, method: str, endpoint: str, operation: str, data: dict = None, max_retries: int = 3) -> Optional[dict]:
-        """发送API请求"""
-        url = f"{self.config.base_url}{endpoint}"
+    def _make_request(self, method: str, endpoint: str, operation: str, data: dict = None, max_retries: int = 3,
+                      raise_unsupported: bool = False) -> Optional[dict]:
+        """
+        发送API请求
+        
+        raise_unsupported为True时，接口返回404/405则抛出EndpointUnsupportedError，
+        调用方可以据此与超时、5xx等结果未知的失败区分开
+        """
+        url = self._endpoints.get(endpoint) or self.config.base_url + endpoint
+        method = method.upper()
+        timeout = self.config.request_timeout
         
         for attempt in range(max_retries):
             try:
-                if method.upper() == 'GET':
-                    response = self.session.get(url, params=data)
+                if method == 'GET':
+                    response = self.session.get(url, params=data, timeout=timeout)
+                elif method == 'DELETE':
+                    response = self.session.delete(url, json=data, timeout=timeout)
                 else:
-                    response = self.session.post(url, json=data)
+                    response = self.session.post(url, json=data, timeout=timeout)
                 
                 if response.status_code == 200:
-                    return response.json()
+                    return json_loads(response.content)
                 elif response.status_code == 400:
                     error_text = response.text
                     if "Request has expired" in error_text:
@@ -152,15 +256,22 @@ class IntelligentPointsFarmer:
                     else:
                         self.logger.error(f"请求失败 {endpoint}: {response.status_code} - {error_text}")
                         return None
+                elif raise_unsupported and response.status_code in UNSUPPORTED_STATUSES:
+                    raise EndpointUnsupportedError(f"{method} {endpoint}: {response.status_code}")
                 else:
                     self.logger.error(f"请求失败 {endpoint}: {response.status_code} - {response.text}")
                     return None
                     
+            except EndpointUnsupportedError:
+                raise
             except Exception as e:
-                self.logger.error(f"请求异常 {endpoint}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
+                # 读超时、响应解析失败等适配器不重试的错误：只对幂等的GET退避重试，POST/DELETE不重试以免重复下单
+                if method == 'GET' and attempt < max_retries - 1:
+                    delay = random.uniform(0.1, min(2.0, 0.2 * 2 ** attempt))
+                    self.logger.warning(f"请求异常，等待{delay:.2f}秒后重试 {attempt + 1}/{max_retries} {endpoint}: {e}")
+                    time.sleep(delay)
                     continue
+                self.logger.error(f"请求异常 {endpoint}: {e}")
                 return None
         
         return None
@@ -189,33 +300,42 @@ class IntelligentPointsFarmer:
             return True
     
     def get_account_balance(self) -> Optional[float]:
-        """获取账户余额"""
+        """获取账户余额（短时缓存，同一周期内的多次调用共用一次请求）"""
+        cached_at, cached_balance = self._balance_cache
+        if cached_balance is not None and time.monotonic() - cached_at < self.config.balance_cache_ttl:
+            return cached_balance
+        
         try:
             balance = self._make_request('GET', '/api/v1/capital', 'getBalance')
             if balance and 'balances' in balance:
-                total_balance = 0.0
-                for asset in balance['balances']:
-                    if asset.get('symbol') in ['SOL', 'USDC', 'BTC', 'ETH']:
-                        total_balance += float(asset.get('totalQuantity', 0))
+                tracked = self._tracked_assets
+                # math.fsum在C层累加，且避免浮点求和的累积误差
+                total_balance = math.fsum(float(asset.get('totalQuantity', 0)) for asset in balance['balances']
+                                          if asset.get('symbol') in tracked)
+                self._balance_cache = (time.monotonic(), total_balance)
                 return total_balance
             return None
         except Exception as e:
             self.logger.error(f"获取账户余额失败: {e}")
             return None
     
-    def _log_operation(self, operation_type: str, details: str):
-        """记录操作"""
-        operation = {
-            'timestamp': datetime.now().isoformat(),
-            'type': operation_type,
-            'details': details
-        }
-        self.operation_history.append(operation)
-        self.stats['total_operations'] += 1
-        
-        # 限制历史记录长度
-        if len(self.operation_history) > 1000:
-            self.operation_history = self.operation_history[-500:]
+    def _log_operation(self, operation_type: str, details: str, stat_key: Optional[str] = None):
+        """记录操作（时间戳存为time.time()浮点数，导出时再格式化），stat_key为同时累加的分类计数"""
+        self.operation_history.append(OpRecord(time.time(), operation_type, details))
+        with self._stats_lock:
+            self.stats['total_operations'] += 1
+            if stat_key is not None:
+                self.stats[stat_key] += 1
+    
+    @staticmethod
+    def _fmt_ts(ts: float) -> str:
+        """将time.time()时间戳格式化为ISO字符串"""
+        return datetime.fromtimestamp(ts).isoformat()
+    
+    def get_operation_history(self) -> List[Dict]:
+        """导出操作历史（时间戳为ISO格式字符串）"""
+        return [{'timestamp': self._fmt_ts(op.timestamp), 'type': op.type, 'details': op.details}
+                for op in self.operation_history]
     
     def execute_diversified_trading(self) -> bool:
         """执行网格量化交易策略 - 专门交易SOL代币"""
@@ -243,19 +363,12 @@ class IntelligentPointsFarmer:
     def execute_data_queries(self) -> bool:
         """执行数据查询操作"""
         try:
-            operations = [
-                ('查询市场信息', self._query_markets),
-                ('查询价格数据', self._query_ticker),
-                ('查询订单簿', self._query_orderbook),
-                ('查询交易记录', self._query_trades)
-            ]
-            
-            operation_name, operation_func = random.choice(operations)
+            ops = self._data_query_ops
+            operation_name, operation_func = ops[random.randrange(len(ops))]
             success = operation_func()
             
             if success:
-                self._log_operation('数据查询', operation_name)
-                self.stats['data_queries'] += 1
+                self._log_operation('数据查询', operation_name, 'data_queries')
             
             return success
             
@@ -263,59 +376,83 @@ class IntelligentPointsFarmer:
             self.logger.error(f"数据查询异常: {e}")
             return False
     
-    def _query_markets(self) -> bool:
-        """查询市场信息"""
-        try:
-            markets = self._make_request('GET', '/api/v1/markets', 'queryMarkets')
-            return markets is not None
-        except Exception as e:
-            self.logger.error(f"查询市场信息失败: {e}")
-            return False
-    
-    def _query_ticker(self) -> bool:
-        """查询价格数据"""
-        try:
-            symbol = random.choice(self.config.trading_pairs)
-            ticker = self._make_request('GET', '/api/v1/ticker', 'queryTicker', {'symbol': symbol})
-            return ticker is not None
-        except Exception as e:
-            self.logger.error(f"查询价格数据失败: {e}")
-            return False
-    
-    def _query_orderbook(self) -> bool:
-        """查询订单簿"""
-        try:
-            symbol = random.choice(self.config.trading_pairs)
-            orderbook = self._make_request('GET', '/api/v1/depth', 'queryOrderbook', {'symbol': symbol})
-            return orderbook is not None
-        except Exception as e:
-            self.logger.error(f"查询订单簿失败: {e}")
+    def _pick_trading_pair(self) -> str:
+        """随机选择一个交易对"""
+        if self._sole_pair is not None:
+            return self._sole_pair
+        pairs = self.config.trading_pairs
+        return pairs[random.randrange(len(pairs))]
+    
+    def start_market_stream(self) -> bool:
+        """启动后台WebSocket订阅交易对的ticker和depth推送，查询价格/订单簿时优先读取本地缓存"""
+        if not HAVE_WEBSOCKET:
+            self.logger.warning("未安装websocket-client，行情查询继续使用HTTP")
             return False
+        if self._market_ws is not None:
+            return True
+        
+        streams = [f'{kind}.{symbol}' for symbol in self.config.trading_pairs for kind in ('ticker', 'depth')]
+        
+        def on_open(ws):
+            ws.send(json.dumps({'method': 'SUBSCRIBE', 'params': streams}))
+            self.logger.info(f"📡 已订阅行情推送: {streams}")
+        
+        def on_message(ws, message):
+            try:
+                payload = json_loads(message)
+                stream = payload.get('stream')
+                if stream:
+                    self._market_cache[stream] = (payload.get('data'), time.monotonic())
+            except Exception as e:
+                self.logger.error(f"处理行情推送失败: {e}")
+        
+        def on_error(ws, error):
+            self.logger.warning(f"行情推送连接异常，回退到HTTP查询: {error}")
+        
+        self._market_ws = websocket.WebSocketApp(self.config.ws_url, on_open=on_open,
+                                                 on_message=on_message, on_error=on_error)
+        threading.Thread(target=self._market_ws.run_forever, kwargs={'ping_interval': 30, 'reconnect': 5},
+                         daemon=True).start()
+        return True
+    
+    def stop_market_stream(self):
+        """停止行情推送订阅并清空缓存"""
+        if self._market_ws is not None:
+            self._market_ws.close()
+            self._market_ws = None
+        self._market_cache.clear()
+    
+    def _get_streamed(self, stream: str) -> Optional[dict]:
+        """读取行情推送缓存，缓存不存在或已过期时返回None"""
+        cached = self._market_cache.get(stream)
+        if cached is None or time.monotonic() - cached[1] > self.config.market_cache_max_age:
+            return None
+        return cached[0]
     
-    def _query_trades(self) -> bool:
-        """查询交易记录"""
+    def _query(self, key: str) -> bool:
+        """按查询表执行只读查询；有推送缓存的频道优先读取缓存"""
+        operation_name, endpoint, instruction, per_symbol, stream = self._QUERY_TABLE[key]
         try:
-            symbol = random.choice(self.config.trading_pairs)
-            trades = self._make_request('GET', '/api/v1/trades', 'queryTrades', {'symbol': symbol})
-            return trades is not None
+            params = None
+            if per_symbol:
+                symbol = self._pick_trading_pair()
+                if stream and self._get_streamed(f'{stream}.{symbol}') is not None:
+                    return True
+                params = {'symbol': symbol}
+            return self._make_request('GET', endpoint, instruction, params) is not None
         except Exception as e:
-            self.logger.error(f"查询交易记录失败: {e}")
+            self.logger.error(f"{operation_name}失败: {e}")
             return False
     
     def execute_lending_operations(self) -> bool:
         """执行借贷操作"""
         try:
-            operations = [
-                ('查询抵押品信息', self._query_collateral),
-                ('查询借贷池信息', self._query_lending_pool)
-            ]
-            
-            operation_name, operation_func = random.choice(operations)
+            ops = self._lending_ops
+            operation_name, operation_func = ops[random.randrange(len(ops))]
             success = operation_func()
             
             if success:
-                self._log_operation('借贷操作', operation_name)
-                self.stats['lending_operations'] += 1
+                self._log_operation('借贷操作', operation_name, 'lending_operations')
             
             return success
             
@@ -323,40 +460,15 @@ class IntelligentPointsFarmer:
             self.logger.error(f"借贷操作异常: {e}")
             return False
     
-    def _query_collateral(self) -> bool:
-        """查询抵押品信息"""
-        try:
-            collateral = self._make_request('GET', '/api/v1/capital', 'queryCollateral')
-            return collateral is not None
-        except Exception as e:
-            self.logger.error(f"查询抵押品信息失败: {e}")
-            return False
-    
-    def _query_lending_pool(self) -> bool:
-        """查询借贷池信息"""
-        try:
-            # 模拟借贷池查询
-            balance = self._make_request('GET', '/api/v1/capital', 'queryLendingPool')
-            return balance is not None
-        except Exception as e:
-            self.logger.error(f"查询借贷池信息失败: {e}")
-            return False
-    
     def execute_account_activities(self) -> bool:
         """执行账户活动"""
         try:
-            operations = [
-                ('查询账户信息', self._query_account_info),
-                ('查询余额信息', self._query_balance),
-                ('查询系统状态', self._query_system_status)
-            ]
-            
-            operation_name, operation_func = random.choice(operations)
+            ops = self._account_ops
+            operation_name, operation_func = ops[random.randrange(len(ops))]
             success = operation_func()
             
             if success:
-                self._log_operation('账户活动', operation_name)
-                self.stats['account_activities'] += 1
+                self._log_operation('账户活动', operation_name, 'account_activities')
             
             return success
             
@@ -364,47 +476,15 @@ class IntelligentPointsFarmer:
             self.logger.error(f"账户活动异常: {e}")
             return False
     
-    def _query_account_info(self) -> bool:
-        """查询账户信息"""
-        try:
-            account = self._make_request('GET', '/api/v1/capital', 'queryAccountInfo')
-            return account is not None
-        except Exception as e:
-            self.logger.error(f"查询账户信息失败: {e}")
-            return False
-    
-    def _query_balance(self) -> bool:
-        """查询余额信息"""
-        try:
-            balance = self._make_request('GET', '/api/v1/capital', 'queryBalance')
-            return balance is not None
-        except Exception as e:
-            self.logger.error(f"查询余额信息失败: {e}")
-            return False
-    
-    def _query_system_status(self) -> bool:
-        """查询系统状态"""
-        try:
-            status = self._make_request('GET', '/api/v1/system/status', 'querySystemStatus')
-            return status is not None
-        except Exception as e:
-            self.logger.error(f"查询系统状态失败: {e}")
-            return False
-    
     def execute_feature_usage(self) -> bool:
         """执行功能使用"""
         try:
-            operations = [
-                ('查询系统状态', self._query_system_status),
-                ('测试API端点', self._test_api_endpoints)
-            ]
-            
-            operation_name, operation_func = random.choice(operations)
+            ops = self._feature_ops
+            operation_name, operation_func = ops[random.randrange(len(ops))]
             success = operation_func()
             
             if success:
-                self._log_operation('功能使用', operation_name)
-                self.stats['feature_usage'] += 1
+                self._log_operation('功能使用', operation_name, 'feature_usage')
             
             return success
             
@@ -412,6 +492,16 @@ class IntelligentPointsFarmer:
             self.logger.error(f"功能使用异常: {e}")
             return False
     
+    def _probe_endpoint(self, endpoint: str) -> bool:
+        """探测端点是否可用：只读取状态码，响应体不下载也不解析"""
+        url = self._endpoints.get(endpoint) or self.config.base_url + endpoint
+        try:
+            with self.session.get(url, stream=True, timeout=5) as response:
+                return response.status_code == 200
+        except Exception as e:
+            self.logger.error(f"端点探测异常 {endpoint}: {e}")
+            return False
+    
     def _test_api_endpoints(self) -> bool:
         """测试API端点"""
         try:
@@ -422,12 +512,11 @@ class IntelligentPointsFarmer:
                 '/api/v1/capital'
             ]
             
-            for endpoint in endpoints:
-                result = self._make_request('GET', endpoint, 'testEndpoint')
-                if result is None:
-                    return False
+            # 并发请求所有端点，耗时取决于最慢的一个而不是总和
+            with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+                results = list(executor.map(self._probe_endpoint, endpoints))
             
-            return True
+            return all(results)
         except Exception as e:
             self.logger.error(f"测试API端点失败: {e}")
             return False
@@ -437,23 +526,10 @@ class IntelligentPointsFarmer:
         try:
             self.logger.info("🔄 开始执行新周期")
             
-            # 随机选择操作类型
-            operations = [
-                ('网格交易', self.execute_diversified_trading, self.config.trading_weight),
-                ('数据查询', self.execute_data_queries, self.config.data_query_weight),
-                ('账户活动', self.execute_account_activities, self.config.account_activity_weight),
-                ('借贷操作', self.execute_lending_operations, self.config.lending_weight),
-                ('功能使用', self.execute_feature_usage, self.config.feature_usage_weight)
-            ]
-            
-            # 根据权重选择操作
-            operation_names = [op[0] for op in operations]
-            operation_funcs = [op[1] for op in operations]
-            weights = [op[2] for op in operations]
-            
+            # 根据权重随机选择操作类型
             operation_name, operation_func = random.choices(
-                list(zip(operation_names, operation_funcs)), 
-                weights=weights
+                self._cycle_ops,
+                cum_weights=self._cycle_cum_weights
             )[0]
             
             # 执行选中的操作
@@ -486,8 +562,13 @@ class IntelligentPointsFarmer:
             if self.initial_balance:
                 self.logger.info(f"💰 初始余额: {self.initial_balance:.2f}U")
             
+            # 行情查询改为读取推送缓存，减少每个周期的HTTP往返
+            self.start_market_stream()
+            
             cycle_count = 0
-            start_time = datetime.now()
+            # 使用单调时钟的截止时间调度，周期间隔不受系统时间调整影响，也不会累积偏移
+            start = time.monotonic()
+            next_deadline = start
             
             while cycle_count < self.config.daily_cycles:
                 try:
@@ -496,7 +577,7 @@ class IntelligentPointsFarmer:
                     cycle_count += 1
                     
                     # 计算剩余时间
-                    elapsed = (datetime.now() - start_time).total_seconds()
+                    elapsed = time.monotonic() - start
                     remaining_cycles = self.config.daily_cycles - cycle_count
                     avg_cycle_time = elapsed / cycle_count if cycle_count > 0 else 0
                     estimated_remaining = remaining_cycles * avg_cycle_time
@@ -504,10 +585,13 @@ class IntelligentPointsFarmer:
                     self.logger.info(f"📈 进度: {cycle_count}/{self.config.daily_cycles} 周期完成")
                     self.logger.info(f"⏱️ 预计剩余时间: {estimated_remaining/3600:.1f} 小时")
                     
-                    # 随机间隔
+                    # 随机间隔从上一个截止时间起算；已落后时立即执行下一周期，但不连续补跑
                     interval = random.randint(*self.config.operation_interval)
-                    self.logger.info(f"⏳ 等待 {interval} 秒后执行下一周期")
-                    time.sleep(interval)
+                    now = time.monotonic()
+                    next_deadline = max(next_deadline + interval, now)
+                    sleep_for = max(0.0, next_deadline - now)
+                    self.logger.info(f"⏳ 等待 {sleep_for:.0f} 秒后执行下一周期")
+                    time.sleep(sleep_for)
                     
                 except KeyboardInterrupt:
                     self.logger.info("⏹️ 用户中断，停止刷分")
@@ -517,7 +601,8 @@ class IntelligentPointsFarmer:
                     time.sleep(10)  # 异常后等待10秒
                     continue
             
-            # 停止网格策略
+            # 停止行情推送和网格策略
+            self.stop_market_stream()
             self.grid_strategy.stop_strategy()
             
             # 输出最终统计
@@ -531,28 +616,30 @@ class IntelligentPointsFarmer:
         try:
             operations_count = 0
             
-            # 随机选择其他操作类型
-            other_operations = [
-                ('数据查询', self.execute_data_queries),
-                ('账户活动', self.execute_account_activities),
-                ('借贷操作', self.execute_lending_operations),
-                ('功能使用', self.execute_feature_usage)
-            ]
-            
-            # 随机选择1-2个操作执行
-            num_operations = random.randint(1, 2)
-            selected_operations = random.sample(other_operations, num_operations)
-            
-            for operation_name, operation_func in selected_operations:
-                try:
-                    success = operation_func()
-                    if success:
-                        operations_count += 1
-                        self.logger.info(f"✅ {operation_name} 执行成功")
-                    else:
-                        self.logger.info(f"ℹ️ {operation_name} 执行失败（属正常现象）")
-                except Exception as e:
-                    self.logger.error(f"❌ {operation_name} 执行异常: {e}")
+            # 随机选择1-2个不重复的操作执行，互不依赖的查询并发发出
+            ops = self._other_ops
+            n = len(ops)
+            i = random.randrange(n)
+            selected_operations = [ops[i]]
+            if random.randrange(2):
+                j = random.randrange(n - 1)
+                j += (j >= i)
+                selected_operations.append(ops[j])
+            num_operations = len(selected_operations)
+            
+            with ThreadPoolExecutor(max_workers=num_operations) as executor:
+                futures = [(name, executor.submit(func)) for name, func in selected_operations]
+                
+                for operation_name, future in futures:
+                    try:
+                        success = future.result()
+                        if success:
+                            operations_count += 1
+                            self.logger.info(f"✅ {operation_name} 执行成功")
+                        else:
+                            self.logger.info(f"ℹ️ {operation_name} 执行失败（属正常现象）")
+                    except Exception as e:
+                        self.logger.error(f"❌ {operation_name} 执行异常: {e}")
             
             return operations_count
             
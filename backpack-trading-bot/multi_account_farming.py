@@ -5,43 +5,77 @@ Backpack多账户智能刷分系统 - 支持代理轮换
 每个账户使用不同的代理IP，实现多账户同时刷分
 """
 
+import argparse
 import asyncio
-import json
+import atexit
 import logging
+import logging.handlers
+import queue
 import random
+import sys
 import time
 import threading
 import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from itertools import cycle
+from operator import itemgetter
 from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import requests
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from intelligent_points_farming import PointsFarmingConfig, IntelligentPointsFarmer
+from http_utils import json_loads
+from file_utils import start_queue_logging
+
+try:
+    from asset_manager import AssetManager, AssetConfig
+    HAVE_ASSET_MGR = True
+except ImportError:
+    HAVE_ASSET_MGR = False
+
+try:
+    import uvloop
+    HAVE_UVLOOP = True
+except ImportError:
+    HAVE_UVLOOP = False
+
+# 事件循环优先使用uvloop（libuv实现，Windows不支持），未安装时回退到标准asyncio
+_run_async = uvloop.run if HAVE_UVLOOP else asyncio.run
+
+# dataclass的slots参数需要Python 3.10+
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# 配置文件字段提取器（顺序与dataclass字段顺序一致）
+_proxy_fields = itemgetter('enabled', 'gateway', 'port', 'username', 'password')
+_account_fields = itemgetter('account_id', 'name', 'api_key', 'private_key')
 
 # 加载环境变量
 load_dotenv()
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class ProxyConfig:
-    """代理配置"""
+    """代理配置（不可变，代理URL在创建时生成一次）"""
     enabled: bool = False
     gateway: str = ""
     port: int = 0
     username: str = ""
     password: str = ""
+    _url: Optional[str] = field(init=False, default=None, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if self.enabled:
+            object.__setattr__(self, '_url', f"http://{self.username}:{self.password}@{self.gateway}:{self.port}")
     
-    def get_proxy_url(self) -> str:
+    def get_proxy_url(self) -> Optional[str]:
         """获取代理URL"""
-        if not self.enabled:
-            return None
-        return f"http://{self.username}:{self.password}@{self.gateway}:{self.port}"
+        return self._url
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class AccountConfig:
-    """账户配置"""
+    """账户配置（解析后不再修改）"""
     account_id: str
     name: str
     api_key: str
@@ -50,7 +84,7 @@ class AccountConfig:
     enabled: bool = True
     description: str = ""
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class MultiAccountConfig:
     """多账户配置"""
     accounts: List[AccountConfig]
@@ -68,8 +102,10 @@ class ProxyRotator:
     
     def __init__(self, proxy_configs: List[ProxyConfig]):
         self.proxy_configs = [p for p in proxy_configs if p.enabled]
-        self.current_index = 0
-        self.last_rotation = time.time()
+        self.proxy_urls = [p.get_proxy_url() for p in self.proxy_configs]
+        self._cycle = cycle(self.proxy_urls)
+        self._current = next(self._cycle, None)
+        self.last_rotation = time.monotonic()  # 单调时钟，系统时间调整不影响轮换
         self.rotation_interval = 300  # 5分钟轮换一次
         
     def get_next_proxy(self) -> Optional[str]:
@@ -78,17 +114,18 @@ class ProxyRotator:
             return None
             
         # 检查是否需要轮换
-        if time.time() - self.last_rotation > self.rotation_interval:
-            self.current_index = (self.current_index + 1) % len(self.proxy_configs)
-            self.last_rotation = time.time()
+        now = time.monotonic()
+        if now - self.last_rotation > self.rotation_interval:
+            self._current = next(self._cycle)
+            self.last_rotation = now
             
-        return self.proxy_configs[self.current_index].get_proxy_url()
+        return self._current
     
     def get_current_proxy(self) -> Optional[str]:
         """获取当前代理"""
         if not self.proxy_configs:
             return None
-        return self.proxy_configs[self.current_index].get_proxy_url()
+        return self._current
 
 class MultiAccountPointsFarmer:
     """多账户积分刷取系统"""
@@ -99,15 +136,12 @@ class MultiAccountPointsFarmer:
         self.account_farmers = {}
         self.proxy_rotator = ProxyRotator([acc.proxy for acc in config.accounts])
         
-        # 设置日志
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('multi_account_farming.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        # 设置日志（与basicConfig一样只在未配置时生效）：各账户线程只把记录放入队列，由后台线程写文件和控制台
+        self._log_listener = None
+        self._log_handlers = ()
+        if not logging.getLogger().handlers:
+            self._log_listener, self._log_handlers = start_queue_logging('multi_account_farming.log')
+            atexit.register(self.stop_logging)
         self.logger = logging.getLogger(__name__)
         
         # 统计信息
@@ -119,10 +153,14 @@ class MultiAccountPointsFarmer:
             'account_stats': {}
         }
         
+    def stop_logging(self):
+        """停止后台日志线程，写出队列中剩余的记录"""
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+    
     def create_account_farmer(self, account_config: AccountConfig):
         """为单个账户创建刷分器"""
-        from intelligent_points_farming import PointsFarmingConfig, IntelligentPointsFarmer
-        
         # 创建账户特定的配置
         farming_config = PointsFarmingConfig()
         farming_config.api_key = account_config.api_key
@@ -139,12 +177,14 @@ class MultiAccountPointsFarmer:
         # 设置代理
         if account_config.proxy.enabled:
             farmer.set_proxy(account_config.proxy.get_proxy_url())
-            self.logger.info(f"🔗 账户 {account_config.name} 使用代理: {account_config.proxy.gateway}:{account_config.proxy.port}")
+            self.logger.info("🔗 账户 %s 使用代理: %s:%s", account_config.name, account_config.proxy.gateway, account_config.proxy.port)
         
         # 检查并补足资产（与单账户模式保持一致）
+        if not HAVE_ASSET_MGR:
+            self.logger.warning("⚠️ 账户 %s 资产管理器未找到，跳过资产检查", account_config.name)
+            return farmer
+        
         try:
-            from asset_manager import AssetManager, AssetConfig
-            
             # 为当前账户创建资产管理器
             asset_config = AssetConfig()
             asset_config.api_key = account_config.api_key
@@ -159,30 +199,29 @@ class MultiAccountPointsFarmer:
                     'http': proxy_url,
                     'https': proxy_url
                 }
-                self.logger.info(f"🔗 资产管理器使用代理: {proxy_url}")
+                self.logger.info("🔗 资产管理器使用代理: %s", proxy_url)
             
-            # 获取资产建议
-            recommendations = asset_manager.get_asset_recommendations()
-            self.logger.info(f"📊 账户 {account_config.name} 资产状态:")
+            # 获取资产建议（资产和价格只查询一次，检查与补足共用）
+            snapshot = asset_manager.get_assets_and_prices()
+            recommendations = asset_manager.get_asset_recommendations(snapshot)
+            self.logger.info("📊 账户 %s 资产状态:", account_config.name)
             for asset, recommendation in recommendations.items():
-                self.logger.info(f"   {asset}: {recommendation}")
+                self.logger.info("   %s: %s", asset, recommendation)
             
             # 检查是否需要补足资产
             needs_replenishment = any("需要" in rec for rec in recommendations.values())
             
             if needs_replenishment:
-                self.logger.info(f"⚠️ 账户 {account_config.name} 检测到资产不足，自动补足资产...")
-                success = asset_manager.check_and_replenish_assets()
+                self.logger.info("⚠️ 账户 %s 检测到资产不足，自动补足资产...", account_config.name)
+                success = asset_manager.check_and_replenish_assets(snapshot)
                 
                 if success:
-                    self.logger.info(f"✅ 账户 {account_config.name} 资产补足完成！")
+                    self.logger.info("✅ 账户 %s 资产补足完成！", account_config.name)
                 else:
-                    self.logger.info(f"ℹ️ 账户 {account_config.name} 资产补足失败，继续运行策略（偶尔交易失败属正常现象）")
+                    self.logger.info("ℹ️ 账户 %s 资产补足失败，继续运行策略（偶尔交易失败属正常现象）", account_config.name)
             
-        except ImportError:
-            self.logger.warning(f"⚠️ 账户 {account_config.name} 资产管理器未找到，跳过资产检查")
         except Exception as e:
-            self.logger.error(f"⚠️ 账户 {account_config.name} 资产检查异常: {e}")
+            self.logger.error("⚠️ 账户 %s 资产检查异常: %s", account_config.name, e)
         
         return farmer
     
@@ -198,7 +237,7 @@ class MultiAccountPointsFarmer:
         }
         
         try:
-            self.logger.info(f"🚀 启动账户: {account_config.name} ({account_config.account_id})")
+            self.logger.info("🚀 启动账户: %s (%s)", account_config.name, account_config.account_id)
             
             # 创建账户刷分器
             farmer = self.create_account_farmer(account_config)
@@ -209,18 +248,24 @@ class MultiAccountPointsFarmer:
             
             # 运行刷分循环
             for cycle in range(1, self.config.daily_cycles + 1):
-                self.logger.info(f"🔄 账户 {account_config.name} 开始第 {cycle}/{self.config.daily_cycles} 个周期")
-                
-                # 执行操作周期
-                cycle_stats = farmer.execute_operation_cycle()
+                self.logger.info("🔄 账户 %s 开始第 %s/%s 个周期", account_config.name, cycle, self.config.daily_cycles)
                 
-                # 更新统计
-                account_stats['operations'] += sum(cycle_stats.values())
+                # 执行操作周期：按权重随机执行一次操作，再执行1-2个其他操作
+                cycle_stats = {
+                    'cycle': int(farmer.execute_cycle()),
+                    'other': farmer.execute_other_operations()
+                }
                 
-                self.logger.info(f"✅ 账户 {account_config.name} 第 {cycle} 个周期完成:")
+                # 更新统计（一次遍历累计总数并生成明细，合并为一条日志）
+                total = 0
+                lines = []
                 for op_type, count in cycle_stats.items():
+                    total += count
                     if count > 0:
-                        self.logger.info(f"   {op_type}: {count} 次操作")
+                        lines.append(f"   {op_type}: {count} 次操作")
+                account_stats['operations'] += total
+                
+                self.logger.info("✅ 账户 %s 第 %s 个周期完成:\n%s", account_config.name, cycle, "\n".join(lines))
                 
                 # 更新盈亏状态
                 farmer.update_pnl_status()
@@ -228,16 +273,16 @@ class MultiAccountPointsFarmer:
                 # 如果不是最后一个周期，等待下一个周期
                 if cycle < self.config.daily_cycles:
                     wait_time = self.config.cycle_interval
-                    self.logger.info(f"⏳ 账户 {account_config.name} 等待 {wait_time//60} 分钟后开始下一个周期...")
+                    self.logger.info("⏳ 账户 %s 等待 %d 分钟后开始下一个周期...", account_config.name, wait_time//60)
                     time.sleep(wait_time)
             
             account_stats['status'] = 'completed'
-            self.logger.info(f"✅ 账户 {account_config.name} 刷分完成")
+            self.logger.info("✅ 账户 %s 刷分完成", account_config.name)
             
         except Exception as e:
             account_stats['status'] = 'error'
             account_stats['errors'] += 1
-            self.logger.error(f"❌ 账户 {account_config.name} 运行错误: {e}")
+            self.logger.error("❌ 账户 %s 运行错误: %s", account_config.name, e)
         
         finally:
             account_stats['end_time'] = datetime.now()
@@ -246,7 +291,17 @@ class MultiAccountPointsFarmer:
         return account_stats
     
     def run_single_account_concurrent(self, account_config: AccountConfig) -> Dict:
-        """运行单个账户的刷分 - 并发网格策略版"""
+        """运行单个账户的刷分 - 并发网格策略版（同步入口，保持原有接口）"""
+        return _run_async(self._run_single_account_concurrent(account_config))
+    
+    async def _run_single_account_concurrent(self, account_config: AccountConfig,
+                                             executor: Optional[Executor] = None) -> Dict:
+        """运行单个账户的刷分 - 并发网格策略版（协程：周期间等待不占用线程，阻塞的API调用交给线程池）"""
+        loop = asyncio.get_running_loop()
+        
+        def run_blocking(func, *args):
+            return loop.run_in_executor(executor, func, *args)
+        
         account_stats = {
             'account_id': account_config.account_id,
             'name': account_config.name,
@@ -257,22 +312,22 @@ class MultiAccountPointsFarmer:
         }
         
         try:
-            self.logger.info(f"🚀 启动账户: {account_config.name} ({account_config.account_id}) - 并发网格策略")
+            self.logger.info("🚀 启动账户: %s (%s) - 并发网格策略", account_config.name, account_config.account_id)
             
             # 创建账户刷分器
-            farmer = self.create_account_farmer(account_config)
+            farmer = await run_blocking(self.create_account_farmer, account_config)
             self.account_farmers[account_config.account_id] = farmer
             
             # 记录初始余额
-            farmer.record_initial_balance()
+            await run_blocking(farmer.record_initial_balance)
             
             # 初始化网格策略
-            self.logger.info(f"🎯 账户 {account_config.name} 初始化网格策略...")
-            grid_result = farmer.grid_strategy.execute_grid_strategy()
+            self.logger.info("🎯 账户 %s 初始化网格策略...", account_config.name)
+            grid_result = await run_blocking(farmer.grid_strategy.execute_grid_strategy)
             if grid_result['success']:
-                self.logger.info(f"✅ 账户 {account_config.name} 网格策略初始化成功")
+                self.logger.info("✅ 账户 %s 网格策略初始化成功", account_config.name)
             else:
-                self.logger.warning(f"⚠️ 账户 {account_config.name} 网格策略初始化失败: {grid_result['message']}")
+                self.logger.warning("⚠️ 账户 %s 网格策略初始化失败: %s", account_config.name, grid_result['message'])
             
             # 运行24小时网格策略循环 - 支持无限循环
             cycle_count = 0
@@ -282,23 +337,23 @@ class MultiAccountPointsFarmer:
             # 无限循环运行，每天24个周期
             while True:
                 try:
-                    self.logger.info(f"🔄 账户 {account_config.name} 第 {day_count} 天 - 开始第 {cycle_count + 1}/{self.config.daily_cycles} 个周期")
+                    self.logger.info("🔄 账户 %s 第 %s 天 - 开始第 %s/%s 个周期", account_config.name, day_count, cycle_count + 1, self.config.daily_cycles)
                     
                     # 执行网格策略更新
-                    grid_result = farmer.grid_strategy.execute_grid_strategy()
+                    grid_result = await run_blocking(farmer.grid_strategy.execute_grid_strategy)
                     
                     if grid_result['success']:
-                        self.logger.info(f"✅ 账户 {account_config.name} 网格策略更新成功 - {grid_result['action']}")
+                        self.logger.info("✅ 账户 %s 网格策略更新成功 - %s", account_config.name, grid_result['action'])
                         account_stats['operations'] += 1
                     else:
-                        self.logger.info(f"ℹ️ 账户 {account_config.name} 网格策略更新失败（属正常现象）")
+                        self.logger.info("ℹ️ 账户 %s 网格策略更新失败（属正常现象）", account_config.name)
                     
                     # 执行其他操作（数据查询、账户活动等）
-                    other_operations = farmer.execute_other_operations()
+                    other_operations = await run_blocking(farmer.execute_other_operations)
                     account_stats['operations'] += other_operations
                     
                     # 更新盈亏状态
-                    farmer.update_pnl_status()
+                    await run_blocking(farmer.update_pnl_status)
                     
                     cycle_count += 1
                     
@@ -307,46 +362,47 @@ class MultiAccountPointsFarmer:
                         # 完成一天的周期，开始新的一天
                         day_count += 1
                         cycle_count = 0
-                        self.logger.info(f"🎉 账户 {account_config.name} 完成第 {day_count-1} 天，开始第 {day_count} 天")
-                        self.logger.info(f"📊 账户 {account_config.name} 第 {day_count-1} 天统计: 总操作 {account_stats['operations']} 次")
+                        self.logger.info("🎉 账户 %s 完成第 %s 天，开始第 %s 天", account_config.name, day_count-1, day_count)
+                        self.logger.info("📊 账户 %s 第 %s 天统计: 总操作 %s 次", account_config.name, day_count-1, account_stats['operations'])
                         
                         # 重置每日统计
                         account_stats['operations'] = 0
                         account_stats['errors'] = 0
                         
                         # 重新初始化网格策略
-                        self.logger.info(f"🔄 账户 {account_config.name} 重新初始化网格策略...")
-                        grid_result = farmer.grid_strategy.execute_grid_strategy()
+                        self.logger.info("🔄 账户 %s 重新初始化网格策略...", account_config.name)
+                        grid_result = await run_blocking(farmer.grid_strategy.execute_grid_strategy)
                         if grid_result['success']:
-                            self.logger.info(f"✅ 账户 {account_config.name} 网格策略重新初始化成功")
+                            self.logger.info("✅ 账户 %s 网格策略重新初始化成功", account_config.name)
                         else:
-                            self.logger.warning(f"⚠️ 账户 {account_config.name} 网格策略重新初始化失败")
+                            self.logger.warning("⚠️ 账户 %s 网格策略重新初始化失败", account_config.name)
                     
                     # 等待下一个周期
                     wait_time = self.config.cycle_interval
-                    self.logger.info(f"⏳ 账户 {account_config.name} 等待 {wait_time//60} 分钟后开始下一个周期...")
-                    time.sleep(wait_time)
+                    self.logger.info("⏳ 账户 %s 等待 %d 分钟后开始下一个周期...", account_config.name, wait_time//60)
+                    await asyncio.sleep(wait_time)
                 
-                except KeyboardInterrupt:
-                    self.logger.info(f"⏹️ 账户 {account_config.name} 用户中断，停止刷分")
+                except asyncio.CancelledError:
+                    # Ctrl+C时事件循环会取消所有账户任务
+                    self.logger.info("⏹️ 账户 %s 用户中断，停止刷分", account_config.name)
                     break
                 except Exception as e:
-                    self.logger.error(f"❌ 账户 {account_config.name} 周期执行异常: {e}")
+                    self.logger.error("❌ 账户 %s 周期执行异常: %s", account_config.name, e)
                     account_stats['errors'] += 1
-                    time.sleep(10)  # 异常后等待10秒
+                    await asyncio.sleep(10)  # 异常后等待10秒
                     continue
             
             # 停止网格策略
-            farmer.grid_strategy.stop_strategy()
-            self.logger.info(f"🛑 账户 {account_config.name} 网格策略已停止")
+            await run_blocking(farmer.grid_strategy.stop_strategy)
+            self.logger.info("🛑 账户 %s 网格策略已停止", account_config.name)
             
             account_stats['status'] = 'completed'
-            self.logger.info(f"✅ 账户 {account_config.name} 刷分完成")
+            self.logger.info("✅ 账户 %s 刷分完成", account_config.name)
             
         except Exception as e:
             account_stats['status'] = 'error'
             account_stats['errors'] += 1
-            self.logger.error(f"❌ 账户 {account_config.name} 运行错误: {e}")
+            self.logger.error("❌ 账户 %s 运行错误: %s", account_config.name, e)
         
         finally:
             account_stats['end_time'] = datetime.now()
@@ -354,49 +410,112 @@ class MultiAccountPointsFarmer:
         
         return account_stats
     
-    def run_multi_account_farming(self):
-        """运行多账户刷分 - 真正的并发网格策略"""
+    async def _run_accounts(self, accounts: List[AccountConfig]):
+        """在事件循环中并发运行所有账户任务"""
+        # 每个账户同一时间只有一个阻塞调用，按账户数分配线程，避免默认线程池上限让后面的账户排队
+        executor = ThreadPoolExecutor(max_workers=len(accounts), thread_name_prefix='account')
+        
+        async def run_account(i: int, account: AccountConfig):
+            # 错开启动时间，2秒间隔，避免同时启动造成API冲突
+            await asyncio.sleep(2 * i)
+            self.logger.info("📝 启动账户任务: %s (第%s/%s个)", account.name, i+1, len(accounts))
+            try:
+                account_stats = await self._run_single_account_concurrent(account, executor)
+                self.stats['account_stats'][account.account_id] = account_stats
+                self.logger.info("✅ 账户 %s 任务完成: %s", account.name, account_stats['status'])
+            except Exception as e:
+                self.logger.error("❌ 账户 %s 任务异常: %s", account.name, e)
+        
+        try:
+            await asyncio.gather(*(run_account(i, account) for i, account in enumerate(accounts)))
+        finally:
+            executor.shutdown(wait=False)
+    
+    def _run_accounts_in_processes(self, accounts: List[AccountConfig]):
+        """每个账户一个独立进程运行（不受GIL限制），子进程日志经队列交给本进程写出"""
+        # spawn启动子进程：不继承本进程的日志监听线程和锁状态
+        ctx = multiprocessing.get_context('spawn')
+        log_queue = ctx.Queue()
+        result_queue = ctx.Queue()
+        log_listener = logging.handlers.QueueListener(log_queue, *(self._log_handlers or logging.getLogger().handlers),
+                                                      respect_handler_level=True)
+        log_listener.start()
+        
+        processes: Dict[str, multiprocessing.Process] = {}
+        try:
+            for i, account in enumerate(accounts):
+                # 添加短暂启动延迟，避免API请求冲突
+                if i > 0:
+                    time.sleep(2)
+                
+                process = ctx.Process(target=_account_process_worker,
+                                      args=(self.config, account, log_queue, result_queue),
+                                      name=f"account-{account.account_id}")
+                process.start()
+                processes[account.account_id] = process
+                self.logger.info("📝 启动账户进程: %s (第%s/%s个, pid=%s)", account.name, i + 1, len(accounts), process.pid)
+            
+            self._collect_process_results(processes, result_queue)
+        except KeyboardInterrupt:
+            # Ctrl+C同时发给了子进程，等待它们各自停止网格策略后退出
+            self.logger.info("⏹️ 用户中断，等待账户进程退出...")
+            self._collect_process_results(processes, result_queue)
+        finally:
+            # 结果已取完再join：子进程在队列数据写入管道前不会退出
+            for process in processes.values():
+                process.join()
+            log_listener.stop()
+    
+    def _collect_process_results(self, processes: Dict[str, multiprocessing.Process], result_queue):
+        """阻塞读取每个账户进程回传的统计，直到全部收到或子进程都已退出"""
+        pending = processes.keys() - self.stats['account_stats'].keys()
+        while pending:
+            try:
+                account_id, account_stats = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                # 子进程异常退出时不会回传结果，全部退出后不再等待
+                if not any(process.is_alive() for process in processes.values()) and result_queue.empty():
+                    break
+                continue
+            pending.discard(account_id)
+            self.stats['account_stats'][account_id] = account_stats
+            self.logger.info("✅ 账户 %s 任务完成: %s", account_stats['name'], account_stats['status'])
+    
+    def run_multi_account_farming(self, mode: str = 'async'):
+        """
+        运行多账户刷分 - 真正的并发网格策略
+        
+        Args:
+            mode: 'async' 所有账户在同一进程的事件循环中运行；'procs' 每个账户一个独立进程
+        """
         self.logger.info("🚀 启动Backpack多账户智能刷分系统 - 并发网格策略版")
         
         # 获取启用的账户
         enabled_accounts = [acc for acc in self.config.accounts if acc.enabled]
-        self.logger.info(f"📊 启用账户数量: {len(enabled_accounts)}")
+        self.logger.info("📊 启用账户数量: %s", len(enabled_accounts))
         
         if not enabled_accounts:
             self.logger.error("❌ 没有启用的账户")
+            self.stop_logging()
             return
         
         # 设置最大并发账户数量 - 支持全并发
         max_accounts = len(enabled_accounts)  # 所有账户同时运行
-        self.logger.info(f"🔄 全并发账户数: {max_accounts}")
-        self.logger.info(f"🚀 所有账户将同时启动，独立运行24小时")
+        self.logger.info("🔄 全并发账户数: %s", max_accounts)
+        self.logger.info("🚀 所有账户将同时启动，独立运行24小时")
         
-        # 使用线程池运行所有账户 - 真正的全并发执行
-        with ThreadPoolExecutor(max_workers=max_accounts) as executor:
-            # 提交所有账户任务
-            future_to_account = {}
-            
-            for i, account in enumerate(enabled_accounts):
-                # 添加短暂启动延迟，避免API请求冲突
-                if i > 0:
-                    time.sleep(2)  # 2秒延迟，避免同时启动造成API冲突
-                
-                future = executor.submit(self.run_single_account_concurrent, account)
-                future_to_account[future] = account
-                self.logger.info(f"📝 提交账户任务: {account.name} (第{i+1}/{len(enabled_accounts)}个)")
-            
-            # 等待所有任务完成
-            for future in as_completed(future_to_account):
-                account = future_to_account[future]
-                try:
-                    account_stats = future.result()
-                    self.stats['account_stats'][account.account_id] = account_stats
-                    self.logger.info(f"✅ 账户 {account.name} 任务完成: {account_stats['status']}")
-                except Exception as e:
-                    self.logger.error(f"❌ 账户 {account.name} 任务异常: {e}")
+        if mode == 'procs':
+            self._run_accounts_in_processes(enabled_accounts)
+        else:
+            # 所有账户在同一个事件循环中并发运行 - 真正的全并发执行
+            try:
+                _run_async(self._run_accounts(enabled_accounts))
+            except KeyboardInterrupt:
+                self.logger.info("⏹️ 用户中断，所有账户已停止")
         
         # 打印总结
         self.print_multi_account_summary()
+        self.stop_logging()
     
     def print_multi_account_summary(self):
         """打印多账户总结"""
@@ -419,6 +538,30 @@ class MultiAccountPointsFarmer:
         
         print("="*80)
 
+def _account_process_worker(config: MultiAccountConfig, account_config: AccountConfig,
+                            log_queue, result_queue):
+    """账户子进程入口：日志发往主进程的队列，运行结束后回传账户统计"""
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+    
+    account_stats = {
+        'account_id': account_config.account_id,
+        'name': account_config.name,
+        'operations': 0,
+        'errors': 1,
+        'status': 'error'
+    }
+    try:
+        farmer = MultiAccountPointsFarmer(config)
+        account_stats = _run_async(farmer._run_single_account_concurrent(account_config))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        root.error("❌ 账户 %s 进程异常: %s", account_config.name, e)
+    finally:
+        result_queue.put((account_config.account_id, account_stats))
+
 def load_multi_account_config(config_file: str = "multi_account_config.json", excel_file: str = None) -> MultiAccountConfig:
     """加载多账户配置"""
     try:
@@ -441,25 +584,16 @@ def load_multi_account_config(config_file: str = "multi_account_config.json", ex
             print(f"❌ 配置文件不存在: {config_file}")
             return None
             
-        with open(config_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(config_file, 'rb') as f:
+            data = json_loads(f.read())
         
         # 解析账户配置
         accounts = []
         for acc_data in data['accounts']:
-            proxy_config = ProxyConfig(
-                enabled=acc_data['proxy']['enabled'],
-                gateway=acc_data['proxy']['gateway'],
-                port=acc_data['proxy']['port'],
-                username=acc_data['proxy']['username'],
-                password=acc_data['proxy']['password']
-            )
+            proxy_config = ProxyConfig(*_proxy_fields(acc_data['proxy']))
             
             account_config = AccountConfig(
-                account_id=acc_data['account_id'],
-                name=acc_data['name'],
-                api_key=acc_data['api_key'],
-                private_key=acc_data['private_key'],
+                *_account_fields(acc_data),
                 proxy=proxy_config,
                 enabled=acc_data['enabled'],
                 description=acc_data['description']
@@ -467,16 +601,18 @@ def load_multi_account_config(config_file: str = "multi_account_config.json", ex
             accounts.append(account_config)
         
         # 创建多账户配置
+        global_settings = data['global_settings']
+        proxy_rotation = data['proxy_rotation']
         multi_config = MultiAccountConfig(
             accounts=accounts,
-            max_concurrent_accounts=data['global_settings']['max_concurrent_accounts'],
-            account_start_delay=data['global_settings']['account_start_delay'],
-            cycle_interval=data['global_settings']['cycle_interval'],
-            daily_cycles=data['global_settings']['daily_cycles'],
-            operation_delay=tuple(data['global_settings']['operation_delay']),
-            max_daily_loss=data['global_settings']['max_daily_loss'],
-            proxy_rotation_enabled=data['proxy_rotation']['enabled'],
-            proxy_rotation_interval=data['proxy_rotation']['rotation_interval']
+            max_concurrent_accounts=global_settings['max_concurrent_accounts'],
+            account_start_delay=global_settings['account_start_delay'],
+            cycle_interval=global_settings['cycle_interval'],
+            daily_cycles=global_settings['daily_cycles'],
+            operation_delay=tuple(global_settings['operation_delay']),
+            max_daily_loss=global_settings['max_daily_loss'],
+            proxy_rotation_enabled=proxy_rotation['enabled'],
+            proxy_rotation_interval=proxy_rotation['rotation_interval']
         )
         
         return multi_config
@@ -487,6 +623,11 @@ def load_multi_account_config(config_file: str = "multi_account_config.json", ex
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="Backpack多账户智能刷分系统")
+    parser.add_argument('--mode', choices=('async', 'procs'), default='async',
+                        help="async: 单进程事件循环运行所有账户；procs: 每个账户一个进程（多核并行）")
+    args = parser.parse_args()
+    
     print("🎯 Backpack多账户智能刷分系统")
     print("=" * 60)
     
@@ -511,7 +652,7 @@ def main():
     multi_farmer = MultiAccountPointsFarmer(config)
     
     # 开始多账户刷分
-    multi_farmer.run_multi_account_farming()
+    multi_farmer.run_multi_account_farming(mode=args.mode)
 
 if __name__ == "__main__":
     main()
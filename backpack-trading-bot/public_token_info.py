@@ -4,26 +4,40 @@
 使用公共API获取代币信息（无法获取账户余额）
 """
 
-import requests
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
+from http_utils import create_session, json_loads
 
 class PublicTokenInfo:
     """公共代币信息查询器"""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 10, markets_cache_ttl: float = 300.0, tickers_cache_ttl: float = 2.0):
         self.base_url = 'https://api.backpack.exchange'
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'PublicTokenInfo/1.0'
-        })
+        self.max_workers = max_workers  # 并发请求数（不超过连接池大小）
+        self.markets_cache_ttl = markets_cache_ttl  # 交易对列表缓存有效期（秒）
+        self.tickers_cache_ttl = tickers_cache_ttl  # 行情缓存有效期（秒）
+        self._markets_cache = (0.0, [])  # (获取时间, 数据)
+        self._tickers_cache = (0.0, {})
+        # 安装了httpx时使用HTTP/2客户端，否则使用requests连接池
+        self.session = create_session({'User-Agent': 'PublicTokenInfo/1.0'}, pool_connections=32, pool_maxsize=64)
+    
+    def close(self):
+        """关闭HTTP客户端，释放连接"""
+        self.session.close()
     
     def get_all_markets(self) -> List[Dict]:
-        """获取所有交易对信息"""
+        """获取所有交易对信息（带TTL缓存）"""
+        fetched_at, markets = self._markets_cache
+        if markets and time.monotonic() - fetched_at < self.markets_cache_ttl:
+            return markets
+        
         try:
             response = self.session.get(f"{self.base_url}/api/v1/markets", timeout=10)
             if response.status_code == 200:
-                return response.json()
+                markets = json_loads(response.content)
+                self._markets_cache = (time.monotonic(), markets)
+                return markets
             else:
                 print(f"❌ 获取市场信息失败: {response.status_code}")
                 return []
@@ -40,7 +54,7 @@ class PublicTokenInfo:
                 timeout=10
             )
             if response.status_code == 200:
-                data = response.json()
+                data = json_loads(response.content)
                 return float(data.get('lastPrice', 0))
             else:
                 print(f"❌ 获取价格失败: {response.status_code}")
@@ -49,37 +63,55 @@ class PublicTokenInfo:
             print(f"❌ 获取价格异常: {e}")
             return None
     
+    def _fetch_symbol(self, endpoint: str, symbol: str):
+        """请求单个交易对的公共端点"""
+        return self.session.get(f"{self.base_url}{endpoint}", params={'symbol': symbol}, timeout=10)
+    
+    def get_all_tickers(self) -> Dict[str, Dict]:
+        """一次请求获取所有交易对的行情 {symbol: ticker}（带TTL缓存）"""
+        fetched_at, tickers = self._tickers_cache
+        if tickers and time.monotonic() - fetched_at < self.tickers_cache_ttl:
+            return tickers
+        
+        try:
+            response = self.session.get(f"{self.base_url}/api/v1/tickers", timeout=10)
+            if response.status_code == 200:
+                tickers = {ticker['symbol']: ticker for ticker in json_loads(response.content)}
+                self._tickers_cache = (time.monotonic(), tickers)
+                return tickers
+            else:
+                print(f"❌ 获取行情失败: {response.status_code}")
+                return {}
+        except Exception as e:
+            print(f"❌ 获取行情异常: {e}")
+            return {}
+    
+    @staticmethod
+    def _parse_token_info(symbol: str, price_data: Dict, depth_data: Optional[Dict] = None) -> Dict:
+        """由行情和深度数据组装代币信息（没有深度数据时不含买一/卖一价）"""
+        token_info = {
+            'symbol': symbol,
+            'price': float(price_data.get('lastPrice', 0)),
+            'volume': float(price_data.get('volume', 0)),
+            'change': float(price_data.get('priceChangePercent', 0)),
+            'high': float(price_data.get('highPrice', 0)),
+            'low': float(price_data.get('lowPrice', 0)),
+        }
+        if depth_data is not None:
+            token_info['bid'] = float(depth_data.get('bids', [[0]])[0][0]) if depth_data.get('bids') else 0
+            token_info['ask'] = float(depth_data.get('asks', [[0]])[0][0]) if depth_data.get('asks') else 0
+        return token_info
+    
     def get_token_info(self, symbol: str) -> Optional[Dict]:
         """获取代币详细信息"""
         try:
-            # 获取价格信息
-            price_response = self.session.get(
-                f"{self.base_url}/api/v1/ticker",
-                params={'symbol': symbol},
-                timeout=10
-            )
-            
-            # 获取深度信息
-            depth_response = self.session.get(
-                f"{self.base_url}/api/v1/depth",
-                params={'symbol': symbol},
-                timeout=10
-            )
+            # 获取价格信息和深度信息
+            price_response = self._fetch_symbol('/api/v1/ticker', symbol)
+            depth_response = self._fetch_symbol('/api/v1/depth', symbol)
             
             if price_response.status_code == 200 and depth_response.status_code == 200:
-                price_data = price_response.json()
-                depth_data = depth_response.json()
-                
-                return {
-                    'symbol': symbol,
-                    'price': float(price_data.get('lastPrice', 0)),
-                    'volume': float(price_data.get('volume', 0)),
-                    'change': float(price_data.get('priceChangePercent', 0)),
-                    'high': float(price_data.get('highPrice', 0)),
-                    'low': float(price_data.get('lowPrice', 0)),
-                    'bid': float(depth_data.get('bids', [[0]])[0][0]) if depth_data.get('bids') else 0,
-                    'ask': float(depth_data.get('asks', [[0]])[0][0]) if depth_data.get('asks') else 0,
-                }
+                return self._parse_token_info(symbol, json_loads(price_response.content),
+                                              json_loads(depth_response.content))
             else:
                 print(f"❌ 获取代币信息失败")
                 return None
@@ -88,18 +120,37 @@ class PublicTokenInfo:
             print(f"❌ 获取代币信息异常: {e}")
             return None
     
-    def get_sol_tokens(self) -> List[Dict]:
-        """获取所有SOL相关的代币信息"""
+    def get_sol_tokens(self, include_depth: bool = False) -> List[Dict]:
+        """
+        获取所有SOL相关的代币信息
+        
+        行情通过/tickers一次取回；include_depth为True时再并发查询各交易对深度（买一/卖一价）
+        """
         try:
-            markets = self.get_all_markets()
-            sol_tokens = []
+            tickers = self.get_all_tickers()
+            symbols = [symbol for symbol in tickers if 'SOL' in symbol and symbol.endswith('_USDC')]
+            if not symbols:
+                return []
             
-            for market in markets:
-                symbol = market.get('symbol', '')
-                if 'SOL' in symbol and symbol.endswith('_USDC'):
-                    token_info = self.get_token_info(symbol)
-                    if token_info:
-                        sol_tokens.append(token_info)
+            if not include_depth:
+                return [self._parse_token_info(symbol, tickers[symbol]) for symbol in symbols]
+            
+            sol_tokens = []
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as executor:
+                futures = [(symbol, executor.submit(self._fetch_symbol, '/api/v1/depth', symbol))
+                           for symbol in symbols]
+                
+                # 按交易对原有顺序收集结果
+                for symbol, depth_future in futures:
+                    try:
+                        depth_response = depth_future.result()
+                        if depth_response.status_code == 200:
+                            sol_tokens.append(self._parse_token_info(symbol, tickers[symbol],
+                                                                     json_loads(depth_response.content)))
+                        else:
+                            print(f"❌ 获取代币信息失败: {symbol}")
+                    except Exception as e:
+                        print(f"❌ 获取代币信息异常: {symbol}, {e}")
             
             return sol_tokens
             
@@ -188,6 +239,7 @@ def main():
             
         elif choice == '4':
             print("👋 再见！")
+            info.close()
             break
             
         else:
@@ -5,6 +5,7 @@ Excel账户一键运行脚本
 最简单的Excel多账户启动方式
 """
 
+import argparse
 import os
 import sys
 from excel_account_loader import ExcelAccountLoader
@@ -12,6 +13,11 @@ from multi_account_farming import MultiAccountPointsFarmer
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="Excel多账户智能刷分系统")
+    parser.add_argument('--mode', choices=('async', 'procs'), default='async',
+                        help="async: 单进程事件循环运行所有账户；procs: 每个账户一个进程（多核并行）")
+    args = parser.parse_args()
+    
     print("🎯 Excel多账户智能刷分系统 - 一键启动")
     print("=" * 60)
     
@@ -73,7 +79,7 @@ def main():
         multi_farmer = MultiAccountPointsFarmer(config)
         
         # 运行多账户刷分
-        multi_farmer.run_multi_account_farming()
+        multi_farmer.run_multi_account_farming(mode=args.mode)
         
     except KeyboardInterrupt:
         print("\n⏹️ 用户中断，服务已停止")
@@ -5,112 +5,225 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import base64
-import json
+from concurrent.futures import ThreadPoolExecutor
+import socket
+import ssl
+from functools import lru_cache
+from typing import NamedTuple
 from dotenv import load_dotenv
+from http_utils import GET_RETRY, json_loads, TokenBucket
 import os
 
+try:
+    import ijson
+    HAVE_IJSON = True
+except ImportError:
+    HAVE_IJSON = False
+
+try:
+    from nacl.signing import SigningKey
+    HAVE_NACL = True
+except ImportError:
+    HAVE_NACL = False
+
+# cryptography作为签名回退，导入较慢，放在模块顶部只付一次
+try:
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+except ImportError:
+    Ed25519PrivateKey = None
+
+HAVE_SIGNING = HAVE_NACL or Ed25519PrivateKey is not None
+
 # 加载环境变量
 load_dotenv()
 
-def test_api_connection():
-    """测试API连接"""
+# API主机的DNS结果缓存 {getaddrinfo参数: (解析结果, 解析时间)}，过期后重新解析
+# 只包装标准库socket.getaddrinfo并按主机名过滤，不依赖urllib3内部实现；其他主机照常解析
+API_HOST = 'api.backpack.exchange'
+DNS_CACHE_TTL = 300.0
+_dns_cache = {}
+_getaddrinfo = socket.getaddrinfo
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """API主机的解析结果缓存DNS_CACHE_TTL秒（保留全部地址，连接失败时urllib3依次尝试）"""
+    if host != API_HOST:
+        return _getaddrinfo(host, port, family, type, proto, flags)
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    entry = _dns_cache.get(key)
+    if entry is not None and now - entry[1] < DNS_CACHE_TTL:
+        return entry[0]
+    infos = _getaddrinfo(host, port, family, type, proto, flags)
+    _dns_cache[key] = (infos, now)
+    return infos
+
+socket.getaddrinfo = _cached_getaddrinfo
+
+# 所有连接共用一个TLS上下文，只协商TLS 1.3（1-RTT握手）
+_SSL_CONTEXT = ssl.create_default_context()
+_SSL_CONTEXT.minimum_version = ssl.TLSVersion.TLSv1_3
+
+class TLSAdapter(HTTPAdapter):
+    """使用共享TLS 1.3上下文的HTTPAdapter"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = _SSL_CONTEXT
+        super().init_poolmanager(*args, **kwargs)
+
+# 模块级连接池会话：同一主机的请求复用keep-alive连接，避免每次重新握手
+SESSION = requests.Session()
+SESSION.headers['Connection'] = 'keep-alive'
+SESSION.mount('https://', TLSAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    # 瞬时故障（连接重置、限流、5xx）指数退避重试；这里的请求都是幂等的GET
+    max_retries=GET_RETRY
+))
+
+# 签名请求限流（与交易器默认的每秒5次请求配额一致），避免循环调用时触发429
+BUCKET = TokenBucket(rate=5.0, capacity=5.0)
+
+# 签名请求的固定部分只构建一次
+SIGNING_WINDOW = 5000
+_BASE_HEADERS = {
+    'Content-Type': 'application/json',
+    'X-Window': str(SIGNING_WINDOW),
+    'User-Agent': 'SimpleAPITest/1.0'
+}
+
+class Signer:
+    """ED25519签名器：优先libsodium，未安装时回退到cryptography"""
+    
+    def __init__(self, private_key_bytes: bytes):
+        if HAVE_NACL:
+            self._key = SigningKey(private_key_bytes)
+        else:
+            self._key = Ed25519PrivateKey.from_private_bytes(private_key_bytes)
+    
+    def sign(self, message: bytes) -> bytes:
+        """签名，返回64字节签名"""
+        if HAVE_NACL:
+            return self._key.sign(message).signature
+        return self._key.sign(message)
+
+class Cfg(NamedTuple):
+    """测试配置：API密钥和Base64编码的私钥"""
+    api_key: str
+    private_key: str
+
+@lru_cache(maxsize=1)
+def _cfg() -> Cfg:
+    """读取环境变量，每个进程只做一次"""
+    return Cfg(os.getenv('BACKPACK_API_KEY', ''), os.getenv('BACKPACK_PRIVATE_KEY', ''))
+
+@lru_cache(maxsize=1)
+def _get_signer() -> Signer:
+    """解码私钥并创建签名器，只在签名测试中使用，成功后每个进程只做一次（私钥无效时抛出ValueError）"""
+    return Signer(base64.b64decode(_cfg().private_key))
+
+def test_api_connection(out=print):
+    """测试API连接（out为输出函数，并发运行时用于按测试收集输出）"""
     try:
-        api_key = os.getenv('BACKPACK_API_KEY', '')
-        private_key = os.getenv('BACKPACK_PRIVATE_KEY', '')
+        cfg = _cfg()
         
-        if not api_key or not private_key:
-            print("❌ 请在config.env文件中设置API密钥")
+        if not cfg.api_key or not cfg.private_key:
+            out("❌ 请在config.env文件中设置API密钥")
             return
         
-        print(f"✅ API Key: {api_key[:20]}...")
-        print(f"✅ Private Key: {'已设置' if private_key else '未设置'}")
+        out(f"✅ API Key: {cfg.api_key[:20]}...")
+        out(f"✅ Private Key: {'已设置' if cfg.private_key else '未设置'}")
         
         # 测试简单的GET请求（不需要签名）
-        print("\n🔍 测试市场信息获取...")
-        response = requests.get('https://api.backpack.exchange/api/v1/markets', timeout=10)
-        
-        if response.status_code == 200:
-            markets = response.json()
-            print(f"✅ 市场信息获取成功，共 {len(markets)} 个交易对")
-            return True
-        else:
-            print(f"❌ 市场信息获取失败: {response.status_code} - {response.text}")
-            return False
+        out("\n🔍 测试市场信息获取...")
+        with SESSION.get('https://api.backpack.exchange/api/v1/markets', timeout=10, stream=True) as response:
+            if response.status_code == 200:
+                # 只需要交易对数量：有ijson时边下载边计数，不构建完整列表
+                if HAVE_IJSON:
+                    response.raw.decode_content = True
+                    market_count = sum(1 for _ in ijson.items(response.raw, 'item'))
+                else:
+                    market_count = len(json_loads(response.content))
+                out(f"✅ 市场信息获取成功，共 {market_count} 个交易对")
+                return True
+            else:
+                out(f"❌ 市场信息获取失败: {response.status_code} - {response.text}")
+                return False
             
     except Exception as e:
-        print(f"❌ 测试失败: {e}")
+        out(f"❌ 测试失败: {e}")
         return False
 
-def test_signed_request():
-    """测试带签名的请求"""
+def test_signed_request(out=print):
+    """测试带签名的请求（out为输出函数，并发运行时用于按测试收集输出）"""
     try:
-        api_key = os.getenv('BACKPACK_API_KEY', '')
-        private_key = os.getenv('BACKPACK_PRIVATE_KEY', '')
+        cfg = _cfg()
         
-        if not api_key or not private_key:
-            print("❌ 请在config.env文件中设置API密钥")
+        if not cfg.api_key or not cfg.private_key:
+            out("❌ 请在config.env文件中设置API密钥")
             return
         
-        print("\n🔍 测试带签名的请求...")
+        if not HAVE_SIGNING:
+            out("❌ 缺少签名库，请安装: pip install pynacl 或 pip install cryptography")
+            return False
         
-        # 生成签名 - 使用Backpack标准格式
-        timestamp = int(time.time() * 1000)
-        window = 5000
-        instruction = 'balanceQuery'
-        signing_string = f"instruction={instruction}&timestamp={timestamp}&window={window}"
+        # 私钥只在签名测试中解码，格式错误不影响基本连接测试
+        try:
+            signer = _get_signer()
+        except ValueError as e:
+            out(f"❌ 私钥格式无效: {e}")
+            return False
         
-        print(f"🔍 时间戳: {timestamp}")
-        print(f"🔍 窗口: {window}")
-        print(f"🔍 指令: {instruction}")
-        print(f"🔍 签名字符串: {signing_string}")
+        out("\n🔍 测试带签名的请求...")
         
-        # 使用ED25519私钥签名
-        from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+        # 生成签名 - 使用Backpack标准格式
+        timestamp = time.time_ns() // 1_000_000
+        instruction = 'balanceQuery'
+        signing_message = b"instruction=balanceQuery&timestamp=%d&window=%d" % (timestamp, SIGNING_WINDOW)
         
-        # 解码私钥
-        private_key_bytes = base64.b64decode(private_key)
-        ed25519_private_key = Ed25519PrivateKey.from_private_bytes(private_key_bytes)
+        out(f"🔍 时间戳: {timestamp}")
+        out(f"🔍 窗口: {SIGNING_WINDOW}")
+        out(f"🔍 指令: {instruction}")
+        out(f"🔍 签名字符串: {signing_message.decode()}")
         
-        # 生成签名
-        signature = ed25519_private_key.sign(signing_string.encode())
-        signature_b64 = base64.b64encode(signature).decode()
+        # 使用ED25519私钥签名（签名器已缓存）
+        signature_b64 = base64.b64encode(signer.sign(signing_message)).decode()
         
-        # 设置请求头
+        # 设置请求头（在固定部分上补充密钥、时间戳和签名）
         headers = {
-            'Content-Type': 'application/json',
-            'X-API-Key': api_key,
+            **_BASE_HEADERS,
+            'X-API-Key': cfg.api_key,
             'X-Timestamp': str(timestamp),
-            'X-Window': str(window),
-            'X-Signature': signature_b64,
-            'User-Agent': 'SimpleAPITest/1.0'
+            'X-Signature': signature_b64
         }
         
         # 发送请求
         url = 'https://api.backpack.exchange/api/v1/capital'
-        response = requests.get(url, headers=headers, timeout=15)
+        BUCKET.take()
+        response = SESSION.get(url, headers=headers, timeout=15)
         
         if response.status_code == 200:
-            data = response.json()
-            print("✅ 带签名的请求成功")
+            data = json_loads(response.content)
+            out("✅ 带签名的请求成功")
             if 'balances' in data:
-                print(f"✅ 获取到 {len(data['balances'])} 个代币余额")
+                out(f"✅ 获取到 {len(data['balances'])} 个代币余额")
                 for balance in data['balances'][:3]:  # 显示前3个
                     symbol = balance.get('symbol', '')
                     total = balance.get('totalQuantity', 0)
                     if float(total) > 0:
-                        print(f"   {symbol}: {total}")
+                        out(f"   {symbol}: {total}")
             return True
         else:
-            print(f"❌ 带签名的请求失败: {response.status_code} - {response.text}")
+            out(f"❌ 带签名的请求失败: {response.status_code} - {response.text}")
             return False
             
     except ImportError:
-        print("❌ 缺少cryptography库，请安装: pip install cryptography")
+        out("❌ 缺少签名库，请安装: pip install pynacl 或 pip install cryptography")
         return False
     except Exception as e:
-        print(f"❌ 签名请求失败: {e}")
+        out(f"❌ 签名请求失败: {e}")
         return False
 
 def main():
@@ -118,21 +231,27 @@ def main():
     print("🧪 Backpack API连接测试")
     print("=" * 50)
     
-    # 测试1: 基本连接
+    # 测试1: 基本连接 / 测试2: 带签名的请求（两者互不依赖，并发执行，各自的输出分开收集后按顺序打印）
+    basic_output, signed_output = [], []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        basic_future = executor.submit(test_api_connection, basic_output.append)
+        signed_future = executor.submit(test_signed_request, signed_output.append)
+        basic_ok = basic_future.result()
+        signed_ok = signed_future.result()
+    
     print("测试1: 基本API连接")
-    basic_ok = test_api_connection()
+    print("\n".join(basic_output))
+    print("\n测试2: 带签名的请求")
+    print("\n".join(signed_output))
     
     if basic_ok:
-        # 测试2: 带签名的请求
-        print("\n测试2: 带签名的请求")
-        signed_ok = test_signed_request()
-        
         if signed_ok:
             print("\n✅ 所有测试通过！API连接正常")
         else:
             print("\n❌ 签名请求失败，请检查API密钥配置")
     else:
         print("\n❌ 基本连接失败，请检查网络连接")
+        print(f"   签名请求: {'通过' if signed_ok else '未通过'}")
 
 if __name__ == "__main__":
     main()
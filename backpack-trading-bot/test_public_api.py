@@ -4,49 +4,63 @@
 测试公共API端点
 """
 
-import requests
-import json
+from concurrent.futures import ThreadPoolExecutor
+from http_utils import create_session, json_loads
+
+# 模块级HTTP客户端：同一主机的请求复用keep-alive连接，安装了httpx时并发探测共用一个HTTP/2连接
+SESSION = create_session()
+
+def probe(url: str, params: dict = None):
+    """请求单个端点，返回响应或异常"""
+    try:
+        return SESSION.get(url, params=params, timeout=10)
+    except Exception as e:
+        return e
 
 def test_public_apis():
-    """测试公共API端点"""
+    """测试公共API端点（所有端点并发请求）"""
     base_url = 'https://api.backpack.exchange'
+    symbol = 'SOL_USDC'
+    symbol_params = {'symbol': symbol}
     
-    # 测试公共端点
+    # 测试公共端点及其参数（行情使用/tickers一次取回全部交易对，再在本地筛选）
     public_endpoints = [
-        '/api/v1/markets',
-        '/api/v1/ticker',
-        '/api/v1/depth',
-        '/api/v1/trades'
+        ('/api/v1/markets', None),
+        ('/api/v1/tickers', None),
+        ('/api/v1/depth', symbol_params),  # 需要参数
+        ('/api/v1/trades', symbol_params)  # 需要参数
     ]
     
     print("🧪 测试Backpack公共API端点")
     print("=" * 50)
     
-    for endpoint in public_endpoints:
-        try:
-            url = f"{base_url}{endpoint}"
+    with ThreadPoolExecutor(max_workers=len(public_endpoints)) as executor:
+        futures = [(endpoint, executor.submit(probe, f"{base_url}{endpoint}", params))
+                   for endpoint, params in public_endpoints]
+        
+        # 按端点顺序输出结果
+        for endpoint, future in futures:
             print(f"\n🔍 测试: {endpoint}")
-            
-            if endpoint == '/api/v1/ticker':
-                # 需要参数
-                response = requests.get(url, params={'symbol': 'SOL_USDC'}, timeout=10)
-            elif endpoint == '/api/v1/depth':
-                # 需要参数
-                response = requests.get(url, params={'symbol': 'SOL_USDC'}, timeout=10)
-            elif endpoint == '/api/v1/trades':
-                # 需要参数
-                response = requests.get(url, params={'symbol': 'SOL_USDC'}, timeout=10)
-            else:
-                response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"✅ 成功: {len(data) if isinstance(data, list) else 'OK'}")
-            else:
-                print(f"❌ 失败: {response.status_code} - {response.text[:100]}")
+            response = future.result()
+            try:
+                if isinstance(response, Exception):
+                    raise response
                 
-        except Exception as e:
-            print(f"❌ 异常: {e}")
+                if response.status_code == 200:
+                    data = json_loads(response.content)
+                    if endpoint == '/api/v1/tickers':
+                        ticker = next((t for t in data if t.get('symbol') == symbol), None)
+                        if ticker is None:
+                            print(f"❌ 失败: 行情中没有 {symbol}")
+                        else:
+                            print(f"✅ 成功: {symbol} 最新价 {ticker.get('lastPrice')}")
+                    else:
+                        print(f"✅ 成功: {len(data) if isinstance(data, list) else 'OK'}")
+                else:
+                    print(f"❌ 失败: {response.status_code} - {response.text[:100]}")
+                    
+            except Exception as e:
+                print(f"❌ 异常: {e}")
 
 if __name__ == "__main__":
     test_public_apis()
@@ -6,24 +6,34 @@
 
 from backpack_token_manager import BackpackTokenManager, TokenManagerConfig
 
+# 配置和管理器在首次测试时创建，之后重复调用测试时复用（不再重新读取环境变量、解析私钥和建立连接池）
+_CFG = None
+_MGR = None
+
+def _get_manager():
+    """获取共享的配置和代币管理器（未设置密钥时管理器为None）"""
+    global _CFG, _MGR
+    if _CFG is None:
+        _CFG = TokenManagerConfig()
+        if _CFG.api_key and _CFG.private_key:
+            _MGR = BackpackTokenManager(_CFG)
+    return _CFG, _MGR
+
 def test_token_manager():
     """测试代币管理工具"""
     try:
         print("🧪 测试代币管理工具...")
         
-        # 创建配置
-        config = TokenManagerConfig()
+        # 获取配置和代币管理器
+        config, manager = _get_manager()
         
-        if not config.api_key or not config.private_key:
+        if manager is None:
             print("❌ 请在config.env文件中设置BACKPACK_API_KEY和BACKPACK_PRIVATE_KEY")
             return
         
         print(f"✅ API Key: {config.api_key[:20]}...")
         print(f"✅ Private Key: {'已设置' if config.private_key else '未设置'}")
         
-        # 创建代币管理器
-        manager = BackpackTokenManager(config)
-        
         # 测试查询余额
         print("\n🔍 测试查询账户余额...")
         balances = manager.get_all_token_balances()